@@ -0,0 +1,204 @@
+"""
+Online scoring of predictions against the closes they forecast.
+
+A prediction made at candle T is for the candle starting at T + 5 minutes
+(its prediction_for). When that candle closes, its close is compared with
+predicted_price (absolute / percentage error), with the close the prediction
+was made at (did `trend` get the direction right) and with `confidence` read
+as P(up) (Brier score). A candle that closes exactly at that price moved
+neither way: it counts towards the price errors but not the hit rate or
+Brier score. Each ticker keeps these over a rolling window of its last scored
+predictions, updated in O(1), and publishes them to Redis as accuracy:{ticker}
+for the API. The window survives restarts as part of the predictor checkpoint.
+"""
+import base64
+import json
+import os
+from collections import deque
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from database.predictionStore import prediction_store
+from database.redisClient import redis_client
+
+# Scored predictions per ticker the rolling metrics cover (375 = a trading week of 5-minute candles)
+ACCURACY_WINDOW = int(os.getenv("ACCURACY_WINDOW", "375"))
+ACCURACY_KEY_PATTERN = "accuracy:{ticker}"
+
+_FIELDS = ("abs_error", "pct_error", "hit", "brier", "moved")
+
+
+class RollingAccuracy:
+    """
+    Running sums of the last `window` scores (plus lifetime totals). Sums are
+    rebuilt from the buffer once per wrap so float drift can't accumulate.
+    """
+
+    def __init__(self, window: int = ACCURACY_WINDOW):
+        self.window = window
+        self.scores = deque(maxlen=window)
+        self.sums = dict.fromkeys(_FIELDS, 0.0)
+        self.lifetime = dict.fromkeys(_FIELDS, 0.0)
+        self.lifetime_count = 0
+        self._since_resync = 0
+
+    def add(self, abs_error: float, pct_error: float, hit: Optional[bool], brier: Optional[float]):
+        """hit and brier are None when the close didn't move."""
+        moved = hit is not None
+        score = (abs_error, pct_error, float(bool(hit)), brier if moved else 0.0, float(moved))
+        if len(self.scores) == self.window:
+            for field, old in zip(_FIELDS, self.scores[0]):
+                self.sums[field] -= old
+        self.scores.append(score)
+        for field, value in zip(_FIELDS, score):
+            self.sums[field] += value
+            self.lifetime[field] += value
+        self.lifetime_count += 1
+
+        self._since_resync += 1
+        if self._since_resync >= self.window:
+            self.sums = {field: sum(s[i] for s in self.scores) for i, field in enumerate(_FIELDS)}
+            self._since_resync = 0
+
+    @staticmethod
+    def _means(sums: dict, count: int) -> dict:
+        moved = int(round(sums["moved"]))
+        return {
+            "count": count,
+            "directional_count": moved,
+            "mae": sums["abs_error"] / count if count else None,
+            "mape": sums["pct_error"] / count if count else None,
+            "hit_rate": sums["hit"] / moved if moved else None,
+            "brier": sums["brier"] / moved if moved else None,
+        }
+
+    def snapshot(self) -> dict:
+        return {
+            "window": self.window,
+            **self._means(self.sums, len(self.scores)),
+            "lifetime": self._means(self.lifetime, self.lifetime_count),
+        }
+
+    def get_state(self) -> dict:
+        scores = np.array(self.scores, dtype=np.float64).reshape(-1, len(_FIELDS))
+        return {
+            "fields": list(_FIELDS),
+            "scores": base64.b64encode(scores.tobytes()).decode(),
+            "lifetime": self.lifetime,
+            "lifetime_count": self.lifetime_count,
+        }
+
+    def set_state(self, state: dict):
+        """Restores get_state() output (keeping the newest `window` scores if the window shrank)."""
+        if state.get("fields") != list(_FIELDS):
+            return
+        scores = np.frombuffer(base64.b64decode(state["scores"]), dtype=np.float64).reshape(-1, len(_FIELDS))
+        self.scores = deque(map(tuple, scores.tolist()), maxlen=self.window)
+        self.sums = {field: sum(s[i] for s in self.scores) for i, field in enumerate(_FIELDS)}
+        self.lifetime = dict(state["lifetime"])
+        self.lifetime_count = state["lifetime_count"]
+        self._since_resync = 0
+
+
+class AccuracyTracker:
+    """
+    Scores each ticker's outstanding prediction when its target candle
+    closes. Predictions handed to expect() are matched in memory; after a
+    restart the match is looked up in the prediction history instead.
+    """
+
+    def __init__(self, store=prediction_store, client=redis_client, window: int = ACCURACY_WINDOW):
+        self.store = store
+        self.client = client
+        self.window = window
+        self.rolling: Dict[str, RollingAccuracy] = {}
+        self.last: Dict[str, dict] = {}
+        self._pending: Dict[str, tuple] = {}
+
+    def expect(self, ticker: str, target: pd.Timestamp, result: dict):
+        """Registers a freshly saved prediction for the candle starting at `target`."""
+        self._pending[ticker] = (target, result)
+
+    def _find(self, ticker: str, timestamp: pd.Timestamp) -> Optional[dict]:
+        pending = self._pending.get(ticker)
+        if pending is not None:
+            target, result = pending
+            if target == timestamp:
+                del self._pending[ticker]
+                return result
+            if target > timestamp:
+                return None
+            del self._pending[ticker]  # its candle never came
+        stored = self.store.range(ticker, timestamp.to_pydatetime(), timestamp.to_pydatetime())
+        return stored[-1] if stored else None
+
+    def on_candle_close(self, ticker: str, timestamp: pd.Timestamp, close: float) -> Optional[dict]:
+        """Scores the prediction made for the candle that just closed, if any; returns the evaluation."""
+        try:
+            prediction = self._find(ticker, timestamp)
+        except Exception as e:
+            print(f"[AccuracyTracker] {ticker}: could not look up prediction for {timestamp}: {e}")
+            return None
+        if not prediction or prediction.get("predicted_price") is None or prediction.get("trend") not in ("UP", "DOWN"):
+            return None
+
+        predicted, base = float(prediction["predicted_price"]), float(prediction["current_price"])
+        up_prob = float(prediction["confidence"])
+        moved = close != base
+        went_up = close > base
+        evaluation = {
+            "ticker": ticker,
+            "prediction_for": str(timestamp),
+            "predicted_price": predicted,
+            "actual_close": float(close),
+            "abs_error": abs(close - predicted),
+            "pct_error": abs(close - predicted) / close * 100 if close else 0.0,
+            # an unchanged close is neither direction
+            "hit": (prediction["trend"] == "UP") == went_up if moved else None,
+            "brier": (up_prob - float(went_up)) ** 2 if moved else None,
+        }
+        rolling = self.rolling.setdefault(ticker, RollingAccuracy(self.window))
+        rolling.add(evaluation["abs_error"], evaluation["pct_error"], evaluation["hit"], evaluation["brier"])
+        self.last[ticker] = evaluation
+        self.publish(ticker)
+        return evaluation
+
+    def snapshot(self, ticker: str) -> Optional[dict]:
+        rolling = self.rolling.get(ticker)
+        if rolling is None:
+            return None
+        return {"ticker": ticker, **rolling.snapshot(), "last": self.last.get(ticker)}
+
+    def get_state(self, ticker: str) -> Optional[dict]:
+        """Rolling window, lifetime totals and last evaluation of a ticker, for its checkpoint."""
+        rolling = self.rolling.get(ticker)
+        if rolling is None:
+            return None
+        return {**rolling.get_state(), "last": self.last.get(ticker)}
+
+    def set_state(self, ticker: str, state: Optional[dict]):
+        if not state:
+            return
+        rolling = RollingAccuracy(self.window)
+        rolling.set_state(state)
+        self.rolling[ticker] = rolling
+        if state.get("last"):
+            self.last[ticker] = state["last"]
+
+    def publish(self, ticker: str):
+        try:
+            self.client.set(ACCURACY_KEY_PATTERN.format(ticker=ticker), json.dumps(self.snapshot(ticker)))
+        except Exception as e:
+            print(f"[AccuracyTracker] Could not publish accuracy for {ticker}: {e}")
+
+
+def load_accuracy(ticker: str = None, client=redis_client) -> Dict[str, dict]:
+    """Published metrics of one ticker, or of every ticker being scored (ticker -> snapshot)."""
+    if ticker:
+        keys = [ACCURACY_KEY_PATTERN.format(ticker=ticker)]
+    else:
+        keys = sorted(client.scan_iter(match=ACCURACY_KEY_PATTERN.format(ticker="*")))
+    values = client.mget(keys) if keys else []
+    return {key.split(":", 1)[1]: json.loads(value) for key, value in zip(keys, values) if value}
@@ -0,0 +1,211 @@
+"""
+Parallel multi-day backtest over a date range and a list of tickers.
+
+    cd backend && python -m Pred_models.backtest_runner --start 2025-07-01 --end 2025-07-31 \
+        [--tickers TATAMOTORS,INFY] [--workers 8] [--out backtest.csv] [--save]
+
+The parent computes each ticker's featured history once and writes it to a
+memory-mapped .npy file; every worker process loads the models once and maps
+those files read-only, so shards only carry row positions in and predictions
+back out. Results come back as one DataFrame (one row per predicted candle).
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from multiprocessing import get_context
+
+import numpy as np
+import pandas as pd
+
+from Pred_models.trend_pred_new import TrendPredict, SIGNAL_COLUMNS
+from Pred_models.indicators import FEATURE_DTYPE
+from Pred_models.feature_matrix import FeatureMatrix
+from Pred_models.data_cache import load_5min_bars, CACHE_DIR
+
+# Per-process state of a worker: predictor config, scalers, backend, opened histories
+_worker = {}
+
+
+def _init_worker(inference_backend: str):
+    predictor = TrendPredict()
+    predictor.INFERENCE_BACKEND = inference_backend
+    models, scalers, trend_features = predictor.load_artifacts()
+    _worker.update(
+        predictor=predictor,
+        scalers=scalers,
+        trend_features=trend_features,
+        backend=predictor.load_backend(models),
+        histories={},
+    )
+
+
+def _open_history(prefix: str):
+    if prefix not in _worker["histories"]:
+        with open(f"{prefix}_columns.json") as f:
+            columns = json.load(f)
+        _worker["histories"][prefix] = (np.load(f"{prefix}_values.npy", mmap_mode="r"), columns)
+    return _worker["histories"][prefix]
+
+
+def _run_shard(prefix: str, positions: np.ndarray, batch_size: int):
+    """Predicts every window ending at `positions` of one ticker's mapped featured history."""
+    predictor = _worker["predictor"]
+    values, columns = _open_history(prefix)
+    first_row = positions[0] - predictor.TIME_STEPS + 1
+    rows = pd.DataFrame(values[first_row:positions[-1] + 1], columns=columns)
+
+    ends = positions - first_row
+    X_price = FeatureMatrix.from_frame(rows, predictor.PRICE_FEATURES, _worker["scalers"]['price'],
+                                       predictor.TIME_STEPS).windows(ends)
+    X_trend = FeatureMatrix.from_frame(rows, _worker["trend_features"], _worker["scalers"]['trend'],
+                                       predictor.TIME_STEPS).windows(ends)
+    price_preds, trend_probs = _worker["backend"].predict(X_price, X_trend, batch_size=batch_size)
+    return positions, price_preds, trend_probs
+
+
+def _write_history(directory: str, ticker: str, featured: pd.DataFrame) -> str:
+    prefix = os.path.join(directory, ticker)
+    np.save(f"{prefix}_values.npy", featured.to_numpy(dtype=FEATURE_DTYPE))
+    with open(f"{prefix}_columns.json", "w") as f:
+        json.dump(list(featured.columns), f)
+    return prefix
+
+
+def run_backtest_range(start_date: str, end_date: str, tickers=None, workers: int = None,
+                       batch_size: int = 256, days_per_shard: int = 5, save: bool = False) -> pd.DataFrame:
+    """
+    Replays every trading day in [start_date, end_date] for each ticker on a
+    process pool and returns all predictions as one table. With save=True the
+    results are also bulk-written to predictions:{ticker}:history.
+    """
+    tickers = list(tickers or ["TATAMOTORS"])
+    workers = workers or os.cpu_count() or 1
+    start, end = pd.to_datetime(start_date).date(), pd.to_datetime(end_date).date()
+    print(f"--- Backtest {start} -> {end} for {tickers} on {workers} workers ---")
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    shared_dir = tempfile.mkdtemp(prefix="backtest-", dir=CACHE_DIR)
+    histories, shards = {}, []
+    try:
+        for ticker in tickers:
+            predictor = TrendPredict(ticker)
+            try:
+                bars = load_5min_bars(predictor.DATA_FILE)
+                featured = predictor.add_features(bars)
+            except Exception as e:
+                print(f"[backtest_runner] {ticker}: could not prepare data: {e}")
+                continue
+            dates = featured.index.date
+            positions = np.flatnonzero((dates >= start) & (dates <= end))
+            positions = positions[positions >= predictor.TIME_STEPS - 1]
+            if len(positions) == 0:
+                print(f"[backtest_runner] {ticker}: no predictable candles in range")
+                continue
+
+            prefix = _write_history(shared_dir, ticker, featured)
+            # keep only what the result table needs: timestamps, the raw float64 closes, ATR and MAs
+            histories[ticker] = (featured.index, bars['close'].reindex(featured.index).to_numpy(),
+                                 featured[SIGNAL_COLUMNS].to_numpy(dtype=np.float64))
+            del bars, featured
+            # shard by whole days so every task has a similar amount of work
+            day_ids = np.unique(dates[positions], return_inverse=True)[1]
+            for chunk in np.array_split(np.arange(day_ids.max() + 1),
+                                        max(1, (day_ids.max() + 1) // days_per_shard)):
+                shard = positions[np.isin(day_ids, chunk)]
+                if len(shard):
+                    shards.append((ticker, prefix, shard))
+
+        if not shards:
+            return pd.DataFrame()
+
+        t0 = time.perf_counter()
+        outputs = {ticker: [] for ticker in histories}
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"),
+                                 initializer=_init_worker,
+                                 initargs=(TrendPredict().INFERENCE_BACKEND,)) as pool:
+            futures = {pool.submit(_run_shard, prefix, shard, batch_size): ticker
+                       for ticker, prefix, shard in shards}
+            for future in as_completed(futures):
+                outputs[futures[future]].append(future.result())
+        print(f"[backtest_runner] {len(shards)} shards predicted in {time.perf_counter() - t0:.2f}s")
+    finally:
+        shutil.rmtree(shared_dir, ignore_errors=True)
+
+    config = TrendPredict()
+    tables = []
+    for ticker, parts in outputs.items():
+        positions = np.concatenate([p[0] for p in parts])
+        order = np.argsort(positions)
+        positions = positions[order]
+        price_preds = np.concatenate([p[1] for p in parts])[order]
+        trend_probs = np.concatenate([p[2] for p in parts])[order]
+
+        index, all_closes, all_signal_inputs = histories[ticker]
+        timestamps = index[positions]
+        closes = all_closes[positions]
+        signal_inputs = all_signal_inputs[positions]
+        tables.append(pd.DataFrame({
+            "ticker": ticker,
+            "timestamp": timestamps,
+            "current_price": closes,
+            "predicted_price": closes * (1 + price_preds / config.SCALE_FACTOR),
+            "trend": np.where(trend_probs > 0.5, "UP", "DOWN"),
+            "confidence": trend_probs.astype(np.float64),
+            "atr": signal_inputs[:, 0],
+            "ma_short": signal_inputs[:, 1],
+            "ma_long": signal_inputs[:, 2],
+            "prediction_for": (timestamps + pd.Timedelta(minutes=5)).time.astype(str),
+        }))
+    table = pd.concat(tables, ignore_index=True)
+
+    if save:
+        now = datetime.utcnow().isoformat()
+        for ticker, group in table.groupby("ticker"):
+            TrendPredict(ticker).save_predictions(ticker, [
+                {
+                    "ticker": ticker,
+                    "current_price": float(r.current_price),
+                    "predicted_price": float(r.predicted_price),
+                    "trend": r.trend,
+                    "confidence": float(r.confidence),
+                    "atr": float(r.atr),
+                    "ma_short": float(r.ma_short),
+                    "ma_long": float(r.ma_long),
+                    "prediction_for": r.prediction_for,
+                    "timestamp": now,
+                    "simulation_date": str(r.timestamp.date()),
+                }
+                for r in group.itertuples()
+            ])
+    return table
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--start", required=True)
+    parser.add_argument("--end", required=True)
+    parser.add_argument("--tickers", default="TATAMOTORS", help="comma-separated")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--days-per-shard", type=int, default=5)
+    parser.add_argument("--out", default=None, help="write the result table to this CSV")
+    parser.add_argument("--save", action="store_true", help="also write predictions to Redis")
+    args = parser.parse_args(argv)
+
+    table = run_backtest_range(args.start, args.end, [t.strip() for t in args.tickers.split(",") if t.strip()],
+                               workers=args.workers, batch_size=args.batch_size,
+                               days_per_shard=args.days_per_shard, save=args.save)
+    print(f"{len(table)} predictions")
+    if args.out:
+        table.to_csv(args.out, index=False)
+    return 0 if len(table) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
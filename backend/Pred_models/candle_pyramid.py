@@ -0,0 +1,318 @@
+"""
+Per-ticker OHLCV candles at 1m, 5m, 15m, 1h and 1d, each level folded
+incrementally from the closed candles of the level below.
+
+Closed candles are appended to one fixed-width binary file per level
+(CANDLE_DIR/{ticker}/{tf}.bin), so any process can serve a time range with a
+memory-mapped binary search instead of re-aggregating minute bars. The still
+forming candle of each level lives in forming.json and is merged in on read.
+source.json records the size, mtime and SHA-1 of the minute CSV the pyramid
+was last synced with, so bars appended to it are folded in on the next read.
+"""
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from Pred_models.data_cache import CACHE_DIR, file_lock, file_sha1, load_minute_bars, tmp_suffix
+
+CANDLE_DIR = os.getenv("CANDLE_DIR", os.path.join(CACHE_DIR, "candles"))
+
+# (name, minutes); each level is built from the one before it
+LEVELS = [("1m", 1), ("5m", 5), ("15m", 15), ("1h", 60), ("1d", 1440)]
+TIMEFRAMES = [name for name, _ in LEVELS]
+
+RECORD = np.dtype([("ts", "<i8"), ("open", "<f8"), ("high", "<f8"), ("low", "<f8"),
+                   ("close", "<f8"), ("volume", "<f8")])
+_NS_PER_MIN = 60 * 10 ** 9
+
+
+def _to_ns(timestamp) -> int:
+    """Wall-clock nanoseconds (tz dropped, so day buckets follow exchange-local midnight)."""
+    ts = pd.Timestamp(timestamp)
+    if ts.tzinfo is not None:
+        ts = ts.tz_localize(None)
+    return ts.value
+
+
+def _aggregate(records: np.ndarray, step_ns: int) -> np.ndarray:
+    """Groups time-sorted records into step_ns buckets (first/max/min/last/sum)."""
+    if len(records) == 0:
+        return np.empty(0, RECORD)
+    buckets = records["ts"] - records["ts"] % step_ns
+    starts = np.r_[0, np.flatnonzero(np.diff(buckets)) + 1]
+    ends = np.r_[starts[1:] - 1, len(records) - 1]
+    out = np.empty(len(starts), RECORD)
+    out["ts"] = buckets[starts]
+    out["open"] = records["open"][starts]
+    out["high"] = np.maximum.reduceat(records["high"], starts)
+    out["low"] = np.minimum.reduceat(records["low"], starts)
+    out["close"] = records["close"][ends]
+    out["volume"] = np.add.reduceat(records["volume"], starts)
+    return out
+
+
+def _merge(candle: Optional[dict], child: dict) -> dict:
+    if candle is None:
+        return dict(child)
+    return {
+        "ts": candle["ts"],
+        "open": candle["open"],
+        "high": max(candle["high"], child["high"]),
+        "low": min(candle["low"], child["low"]),
+        "close": child["close"],
+        "volume": candle["volume"] + child["volume"],
+    }
+
+
+class CandlePyramid:
+    """
+    Writer and reader of one ticker's pyramid. Writers call add_bar() for every
+    closed minute bar and flush() after a batch; readers only need range().
+    """
+
+    def __init__(self, ticker: str, directory: str = None):
+        self.ticker = ticker
+        self.directory = directory or os.path.join(CANDLE_DIR, ticker)
+        self.steps = [minutes * _NS_PER_MIN for _, minutes in LEVELS]
+        self.forming: List[Optional[dict]] = self._load_forming()
+        self.last_bar_ns = self._last_closed_ts(0)
+        # writers keep forming candles in memory; pure readers re-read forming.json on every range()
+        self._writing = False
+
+    # ---- storage ----
+
+    def _path(self, level: int) -> str:
+        return os.path.join(self.directory, f"{LEVELS[level][0]}.bin")
+
+    def _lock_path(self) -> str:
+        return os.path.join(self.directory, ".lock")
+
+    def _closed(self, level: int) -> np.ndarray:
+        path = self._path(level)
+        if not os.path.exists(path) or os.path.getsize(path) < RECORD.itemsize:
+            return np.empty(0, RECORD)
+        # a writer may be mid-append: only map whole records
+        count = os.path.getsize(path) // RECORD.itemsize
+        return np.memmap(path, dtype=RECORD, mode="r", shape=(count,))
+
+    def _last_closed_ts(self, level: int) -> Optional[int]:
+        closed = self._closed(level)
+        return int(closed["ts"][-1]) if len(closed) else None
+
+    def _load_forming(self) -> List[Optional[dict]]:
+        try:
+            with open(os.path.join(self.directory, "forming.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return [None] * len(LEVELS)
+
+    def _write_json(self, name: str, value):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = os.path.join(self.directory, f"{name}.{tmp_suffix()}")
+        with open(tmp, "w") as f:
+            json.dump(value, f)
+        os.replace(tmp, os.path.join(self.directory, name))
+
+    def _load_source(self) -> Optional[dict]:
+        try:
+            with open(os.path.join(self.directory, "source.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _reload(self):
+        """Picks up what other writers committed (the pyramid on disk is the source of truth)."""
+        self.forming = self._load_forming()
+        self.last_bar_ns = self._last_closed_ts(0)
+
+    def flush(self):
+        """Persists the forming candles (closed ones are written as they close)."""
+        self._write_json("forming.json", self.forming)
+
+    def exists(self) -> bool:
+        return os.path.exists(self._path(0))
+
+    # ---- incremental updates ----
+
+    def add_bar(self, timestamp, bar: dict):
+        """Folds one closed minute bar into every level. Bars at or before the last one seen are ignored."""
+        self._writing = True
+        ts = _to_ns(timestamp)
+        if self.last_bar_ns is not None and ts <= self.last_bar_ns:
+            return
+        self.last_bar_ns = ts
+        candle = {"ts": ts, **{k: float(bar[k]) for k in ("open", "high", "low", "close", "volume")}}
+        self._close(0, candle)
+
+    def add_bars(self, bars):
+        """
+        Folds a batch of (timestamp, bar) closed minute bars in and flushes,
+        holding the directory's lock so concurrent writers (the predictor, a
+        source sync in another process) never append the same bar twice.
+        """
+        with file_lock(self._lock_path()):
+            self._reload()
+            for timestamp, bar in bars:
+                self.add_bar(timestamp, bar)
+            self.flush()
+
+    def _close(self, level: int, candle: dict):
+        os.makedirs(self.directory, exist_ok=True)
+        record = np.array([tuple(candle[name] for name in RECORD.names)], dtype=RECORD)
+        with open(self._path(level), "ab") as f:
+            f.write(record.tobytes())
+        if level + 1 < len(LEVELS):
+            self._fold(level + 1, candle, candle["ts"] + self.steps[level])
+
+    def _fold(self, level: int, child: dict, child_end: int):
+        step = self.steps[level]
+        bucket = child["ts"] - child["ts"] % step
+        forming = self.forming[level]
+        if forming is not None and forming["ts"] != bucket:
+            self.forming[level] = None
+            self._close(level, forming)
+            forming = None
+        self.forming[level] = _merge(forming, {**child, "ts": bucket})
+        if child_end >= bucket + step:
+            candle, self.forming[level] = self.forming[level], None
+            self._close(level, candle)
+
+    # ---- backfill ----
+
+    def build_from_minutes(self, df_1min: pd.DataFrame):
+        """
+        Rebuilds the whole pyramid from minute bars, level by level from the
+        closed candles below, leaving the same forming candles add_bar would.
+        Callers hold the directory's lock (see sync).
+        """
+        records = np.empty(len(df_1min), RECORD)
+        index = df_1min.index.tz_localize(None) if df_1min.index.tz is not None else df_1min.index
+        records["ts"] = index.asi8
+        for col in ("open", "high", "low", "close", "volume"):
+            records[col] = df_1min[col].to_numpy(dtype=np.float64)
+
+        os.makedirs(self.directory, exist_ok=True)
+        self.forming = [None] * len(LEVELS)
+        closed = records
+        for level in range(len(LEVELS)):
+            if level > 0:
+                closed = _aggregate(closed, self.steps[level])
+                # the last bucket is still forming unless its final child has closed
+                if len(closed) and child_last_end < closed["ts"][-1] + self.steps[level]:
+                    last = closed[-1]
+                    self.forming[level] = {name: last[name].item() for name in RECORD.names}
+                    closed = closed[:-1]
+            tmp = f"{self._path(level)}.{tmp_suffix()}"
+            closed.tofile(tmp)
+            os.replace(tmp, self._path(level))
+            child_last_end = int(closed["ts"][-1]) + self.steps[level] if len(closed) else -1
+        self.last_bar_ns = int(records["ts"][-1]) if len(records) else None
+        self.flush()
+
+    def sync(self, source: str):
+        """
+        Brings the pyramid up to date with its minute CSV: nothing if the CSV's
+        size and mtime match source.json, the new bars folded in if it only
+        grew (its old contents hash the same), a full rebuild otherwise.
+        """
+        stat = os.stat(source)
+        if _is_synced(self._load_source(), source, stat):
+            return
+        with file_lock(self._lock_path()):
+            stat = os.stat(source)
+            synced = self._load_source()
+            if _is_synced(synced, source, stat):
+                self._reload()
+                return
+            sha1 = file_sha1(source)
+            if synced and synced["source"] == os.path.abspath(source) and self.exists() and (
+                    sha1 == synced["sha1"] or (stat.st_size > synced["size"]
+                                               and file_sha1(source, synced["size"]) == synced["sha1"])):
+                self._reload()
+                if sha1 != synced["sha1"]:
+                    print(f"[CandlePyramid] Extending {self.ticker} from {source} ...")
+                    start = None if self.last_bar_ns is None else pd.Timestamp(self.last_bar_ns + 1)
+                    new = load_minute_bars(source, start)
+                    for timestamp, bar in zip(new.index, new.to_dict("records")):
+                        self.add_bar(timestamp, bar)
+                    self.flush()
+            else:
+                print(f"[CandlePyramid] Backfilling {self.ticker} from {source} ...")
+                self.build_from_minutes(load_minute_bars(source))
+            self._write_json("source.json", {"source": os.path.abspath(source), "sha1": sha1,
+                                             "size": stat.st_size, "mtime_ns": stat.st_mtime_ns})
+
+    # ---- reads ----
+
+    def _forming_view(self, forming: list, level: int) -> Optional[dict]:
+        """The level's forming candle with the forming candles of lower levels merged in."""
+        if level == 0:
+            return None
+        below = self._forming_view(forming, level - 1)
+        candle = forming[level]
+        if below is not None:
+            bucket = below["ts"] - below["ts"] % self.steps[level]
+            if candle is None or candle["ts"] == bucket:
+                candle = _merge(candle, {**below, "ts": bucket})
+        return candle
+
+    def range(self, timeframe: str, start=None, end=None, limit: int = None) -> pd.DataFrame:
+        """
+        Candles of `timeframe` starting in [start, end] (the forming one
+        included), oldest first; with limit, the newest `limit` of them.
+        """
+        if timeframe not in TIMEFRAMES:
+            raise ValueError(f"Unknown timeframe '{timeframe}'. Choose from {TIMEFRAMES}.")
+        level = TIMEFRAMES.index(timeframe)
+        closed = self._closed(level)
+        lo = 0 if start is None else int(np.searchsorted(closed["ts"], _to_ns(start), side="left"))
+        hi = len(closed) if end is None else int(np.searchsorted(closed["ts"], _to_ns(end), side="right"))
+        rows = np.array(closed[lo:hi])
+
+        forming = self._forming_view(self.forming if self._writing else self._load_forming(), level)
+        if forming is not None and (start is None or forming["ts"] >= _to_ns(start)) \
+                and (end is None or forming["ts"] <= _to_ns(end)) \
+                and (not len(closed) or forming["ts"] > closed["ts"][-1]):
+            rows = np.concatenate([rows, np.array([tuple(forming[n] for n in RECORD.names)], dtype=RECORD)])
+        if limit:
+            rows = rows[-limit:]
+
+        return pd.DataFrame({name: rows[name] for name in RECORD.names[1:]},
+                            index=pd.DatetimeIndex(rows["ts"].astype("datetime64[ns]"), name="date"))
+
+
+def _is_synced(synced: Optional[dict], source: str, stat) -> bool:
+    return bool(synced) and synced["source"] == os.path.abspath(source) \
+        and synced["size"] == stat.st_size and synced["mtime_ns"] == stat.st_mtime_ns
+
+
+_pyramids: Dict[str, CandlePyramid] = {}
+_ticker_locks: Dict[str, threading.Lock] = {}
+_pyramids_lock = threading.Lock()
+
+
+def get_pyramid(ticker: str, data_file: str = None) -> CandlePyramid:
+    """
+    Process-wide pyramid for a ticker, synced with its minute CSV on every
+    call (a stat unless the CSV changed; see CandlePyramid.sync). Raises
+    FileNotFoundError, without creating anything, if neither the CSV nor a
+    built pyramid exists. Tickers are locked separately, so one backfill
+    doesn't hold up requests for the others.
+    """
+    with _pyramids_lock:
+        lock = _ticker_locks.setdefault(ticker, threading.Lock())
+    with lock:
+        pyramid = _pyramids.get(ticker)
+        has_source = bool(data_file) and os.path.exists(data_file)
+        if pyramid is None:
+            pyramid = CandlePyramid(ticker, os.path.join(CANDLE_DIR, ticker))
+            if data_file and not has_source and not pyramid.exists():
+                raise FileNotFoundError(data_file)
+            _pyramids[ticker] = pyramid
+        if has_source:
+            pyramid.sync(data_file)
+        return pyramid
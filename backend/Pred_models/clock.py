@@ -0,0 +1,114 @@
+"""
+Clocks for the predictor loop, so a day can be replayed at real speed, at a
+multiple of it, or as fast as possible with the same code path.
+
+Everything time-dependent in the loop goes through a clock: the scheduler's
+candle-close arithmetic and sleeps, ReplaySource pacing, the `timestamp` of
+results and the TTLs of the keys it publishes. Choose one with
+PREDICTOR_CLOCK (real | 60x | fast) and optionally PREDICTOR_CLOCK_START, the
+virtual time a scaled or fast clock starts at (e.g. 2025-07-21T09:15:00).
+Redis leases keep real time: leader failover is about real processes dying.
+"""
+import asyncio
+import math
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+
+class RealClock:
+    name = "real"
+    speed = 1.0
+
+    def time(self) -> float:
+        """Epoch seconds."""
+        return time.time()
+
+    def now(self) -> datetime:
+        """Naive UTC datetime, like datetime.utcnow()."""
+        return datetime.fromtimestamp(self.time(), tz=timezone.utc).replace(tzinfo=None)
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    async def sleep_async(self, seconds: float):
+        await asyncio.sleep(max(0.0, seconds))
+
+    def ttl(self, seconds: float) -> int:
+        """Real seconds a key should live to last `seconds` of this clock's time."""
+        return max(1, int(math.ceil(seconds)))
+
+
+class ScaledClock(RealClock):
+    """Virtual time running `speed` times faster than real time, from `start` (default: now)."""
+
+    def __init__(self, speed: float, start: float = None):
+        if speed <= 0:
+            raise ValueError(f"Clock speed must be positive, not {speed}")
+        self.speed = speed
+        self.name = f"{speed:g}x"
+        self._real_start = time.time()
+        self._start = self._real_start if start is None else start
+
+    def time(self) -> float:
+        return self._start + (time.time() - self._real_start) * self.speed
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            time.sleep(seconds / self.speed)
+
+    async def sleep_async(self, seconds: float):
+        await asyncio.sleep(max(0.0, seconds) / self.speed)
+
+    def ttl(self, seconds: float) -> int:
+        return max(1, int(math.ceil(seconds / self.speed)))
+
+
+class FastClock(RealClock):
+    """
+    As fast as possible: sleeping advances virtual time instantly, so only
+    the actual work takes (real) time. TTLs are left in real time, since a
+    virtual interval has no fixed real length here.
+    """
+    name = "fast"
+    speed = math.inf
+
+    def __init__(self, start: float = None):
+        self._real_start = time.time()
+        self._start = self._real_start if start is None else start
+        self._slept = 0.0
+        self._lock = threading.Lock()
+
+    def time(self) -> float:
+        return self._start + (time.time() - self._real_start) + self._slept
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            with self._lock:
+                self._slept += seconds
+
+    async def sleep_async(self, seconds: float):
+        self.sleep(seconds)
+        await asyncio.sleep(0)
+
+
+def make_clock(spec: str = "real", start: str = None) -> RealClock:
+    """Clock for a PREDICTOR_CLOCK value: 'real', '<speed>x' (e.g. '60x') or 'fast'."""
+    spec = (spec or "real").strip().lower()
+    start_ts = None
+    if start:
+        start_dt = datetime.fromisoformat(start)
+        start_ts = (start_dt if start_dt.tzinfo else start_dt.replace(tzinfo=timezone.utc)).timestamp()
+    if spec == "real":
+        return RealClock()
+    if spec == "fast":
+        return FastClock(start_ts)
+    if spec.endswith("x"):
+        return ScaledClock(float(spec[:-1]), start_ts)
+    raise ValueError(f"Unknown clock '{spec}'. Use real, <speed>x (e.g. 60x) or fast.")
+
+
+# Process-wide default used by the predictor loop
+clock = make_clock(os.getenv("PREDICTOR_CLOCK", "real"), os.getenv("PREDICTOR_CLOCK_START") or None)
@@ -0,0 +1,95 @@
+"""
+One-off conversion of the predictor's Keras .h5 models to TFLite.
+
+    cd backend && python -m Pred_models.convert_models [--quantize] [--tolerance 1e-3]
+
+Writes <model>.tflite next to each .h5 (and <model>_quant.tflite with
+--quantize: post-training dynamic-range quantization, int8 weights with
+float activations), then checks every converted model against its Keras
+original on real scaled windows from DATA_FILE (random ones if the CSV is
+missing) and exits non-zero if the max output difference exceeds the
+tolerance (a looser one for the quantized files).
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+import numpy as np
+import tensorflow as tf
+
+from Pred_models.trend_pred_new import TrendPredict
+from Pred_models.inference import tflite_path, TFLiteModel
+from Pred_models.feature_matrix import FeatureMatrix
+from Pred_models.data_cache import load_5min_bars
+
+
+def convert(model, quantize: bool = False) -> bytes:
+    """
+    Converts through a SavedModel with a fixed batch of 1: the TFLite converter
+    can only fuse the (Bidirectional) LSTMs into native ops for static shapes.
+    """
+    with tempfile.TemporaryDirectory() as export_dir:
+        model.export(export_dir, input_signature=[
+            tf.TensorSpec((1,) + tuple(model.input_shape[1:]), tf.float32)
+        ])
+        converter = tf.lite.TFLiteConverter.from_saved_model(export_dir)
+        if quantize:
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        return converter.convert()
+
+
+def check_parity(model, path: str, X: np.ndarray) -> float:
+    """Max absolute difference between the Keras model and the TFLite file on X."""
+    lite = TFLiteModel(path)
+    expected = model(X, training=False).numpy()[:, 0]
+    actual = np.array([lite.run(x) for x in X])
+    return float(np.abs(expected - actual).max())
+
+
+def sample_windows(predictor: TrendPredict, samples: int):
+    """Scaled (samples, TIME_STEPS, F) windows for both models from the real data, if available."""
+    models, scalers, trend_features = predictor.load_artifacts()
+    try:
+        featured = predictor.add_features(load_5min_bars(predictor.DATA_FILE))
+        price = FeatureMatrix.from_frame(featured, predictor.PRICE_FEATURES, scalers['price'], predictor.TIME_STEPS)
+        trend = FeatureMatrix.from_frame(featured, trend_features, scalers['trend'], predictor.TIME_STEPS)
+        ends = np.linspace(predictor.TIME_STEPS - 1, len(price) - 1, samples).astype(int)
+        return models, np.ascontiguousarray(price.windows(ends)), np.ascontiguousarray(trend.windows(ends))
+    except Exception as e:
+        print(f"[convert_models] No real data for parity check ({e}); using random scaled windows.")
+        rng = np.random.default_rng(0)
+        X_price = rng.standard_normal((samples,) + tuple(models['price_lstm'].input_shape[1:])).astype(np.float32)
+        X_trend = rng.standard_normal((samples,) + tuple(models['trend'].input_shape[1:])).astype(np.float32)
+        return models, X_price, X_trend
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quantize", action="store_true", help="also write a dynamic-range quantized variant")
+    parser.add_argument("--tolerance", type=float, default=1e-3, help="max allowed |keras - tflite| output difference")
+    parser.add_argument("--quant-tolerance", type=float, default=1e-2, help="same, for the quantized variants")
+    parser.add_argument("--samples", type=int, default=200, help="windows used for the parity check")
+    args = parser.parse_args(argv)
+
+    predictor = TrendPredict()
+    predictor.INFERENCE_BACKEND = "keras"  # the conversion itself always needs the Keras models
+    models, X_price, X_trend = sample_windows(predictor, args.samples)
+
+    ok = True
+    for h5_path, model, X in ((predictor.PRICE_LSTM_MODEL_PATH, models['price_lstm'], X_price),
+                              (predictor.TREND_MODEL_PATH, models['trend'], X_trend)):
+        for quantized in ((False, True) if args.quantize else (False,)):
+            out_path = tflite_path(h5_path, quantized)
+            with open(out_path, "wb") as f:
+                f.write(convert(model, quantize=quantized))
+            diff = check_parity(model, out_path, X)
+            status = "OK" if diff <= (args.quant_tolerance if quantized else args.tolerance) else "FAIL"
+            ok = ok and status == "OK"
+            print(f"{status}  {out_path}  {os.path.getsize(out_path) / 1024:.0f} KB"
+                  f"  (h5 {os.path.getsize(h5_path) / 1024:.0f} KB)  max |diff| = {diff:.2e}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
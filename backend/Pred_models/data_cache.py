@@ -0,0 +1,186 @@
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+CACHE_DIR = os.getenv("DATA_CACHE_DIR", "Pred_models/.cache")
+CACHE_VERSION = 1
+
+OHLCV_AGG = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
+
+
+def resample_5min(df_1min: pd.DataFrame) -> pd.DataFrame:
+    """The 5-minute OHLCV aggregation the predictor has always used."""
+    return df_1min.resample('5T').agg(OHLCV_AGG).dropna()
+
+
+def file_sha1(path: str, size: int = None) -> str:
+    """SHA-1 of the file's contents, or of only its first `size` bytes."""
+    h = hashlib.sha1()
+    remaining = float('inf') if size is None else size
+    with open(path, 'rb') as f:
+        while remaining > 0:
+            chunk = f.read(int(min(1 << 20, remaining)))
+            if not chunk:
+                break
+            h.update(chunk)
+            remaining -= len(chunk)
+    return h.hexdigest()
+
+
+@contextmanager
+def file_lock(path: str):
+    """Exclusive advisory lock on `path` (created if missing), held across processes and threads."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def tmp_suffix() -> str:
+    """Unique per process and thread, for files that are written and then renamed into place."""
+    return f"tmp-{os.getpid()}-{threading.get_ident()}"
+
+
+def _cache_path(source: str) -> str:
+    return os.path.join(CACHE_DIR, os.path.splitext(os.path.basename(source))[0])
+
+
+def _write_frame(directory: str, prefix: str, df: pd.DataFrame) -> list:
+    np.save(os.path.join(directory, f"{prefix}_index.npy"), df.index.asi8)
+    for col in df.columns:
+        np.save(os.path.join(directory, f"{prefix}_{col}.npy"), df[col].to_numpy())
+    return list(df.columns)
+
+
+def _stamp(value, tz) -> int:
+    """Stored index value (UTC ns if the source had a timezone) of a naive or aware timestamp."""
+    ts = pd.Timestamp(value)
+    if tz:
+        ts = (ts.tz_localize(tz) if ts.tzinfo is None else ts).tz_convert('UTC')
+    return ts.value
+
+
+def _read_frame(directory: str, prefix: str, columns: list, tz, index_name, start=None, end=None) -> pd.DataFrame:
+    """Rows in [start, end) only; the columns are memory-mapped, so rows outside are never read."""
+    stamps = np.load(os.path.join(directory, f"{prefix}_index.npy"), mmap_mode='r')
+    lo = 0 if start is None else int(np.searchsorted(stamps, _stamp(start, tz), side='left'))
+    hi = len(stamps) if end is None else int(np.searchsorted(stamps, _stamp(end, tz), side='left'))
+    index = pd.DatetimeIndex(np.array(stamps[lo:hi]).view('datetime64[ns]'), name=index_name)
+    if tz:
+        index = index.tz_localize('UTC').tz_convert(tz)
+    data = {col: np.load(os.path.join(directory, f"{prefix}_{col}.npy"), mmap_mode='r')[lo:hi] for col in columns}
+    return pd.DataFrame(data, index=index)
+
+
+def _load_manifest(directory: str):
+    try:
+        with open(os.path.join(directory, "manifest.json")) as f:
+            manifest = json.load(f)
+        return manifest if manifest.get("version") == CACHE_VERSION else None
+    except (OSError, ValueError):
+        return None
+
+
+def _write_manifest(directory: str, manifest: dict):
+    tmp = os.path.join(directory, f"manifest.json.{tmp_suffix()}")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, os.path.join(directory, "manifest.json"))
+
+
+def _build(source: str, directory: str, sha1: str, stat) -> dict:
+    print(f"[data_cache] Building columnar cache for {source} ...")
+    t0 = time.perf_counter()
+    df_1min = pd.read_csv(source, parse_dates=["date"], index_col="date")
+    df_5min = resample_5min(df_1min)
+
+    tmp_dir = f"{directory}.{tmp_suffix()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    manifest = {
+        "version": CACHE_VERSION,
+        "source": os.path.abspath(source),
+        "sha1": sha1,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "tz": str(df_1min.index.tz) if df_1min.index.tz is not None else None,
+        "index_name": df_1min.index.name,
+        "columns_1min": _write_frame(tmp_dir, "1min", df_1min),
+        "columns_5min": _write_frame(tmp_dir, "5min", df_5min),
+    }
+    _write_manifest(tmp_dir, manifest)
+
+    # swap the finished cache into place so readers never see a half-written one
+    old_dir = f"{directory}.old-{tmp_suffix()}"
+    if os.path.exists(directory):
+        os.replace(directory, old_dir)
+    os.replace(tmp_dir, directory)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    print(f"[data_cache] Cache built in {time.perf_counter() - t0:.2f}s -> {directory}")
+    return manifest
+
+
+def _is_fresh(manifest, stat) -> bool:
+    return bool(manifest) and manifest["size"] == stat.st_size and manifest["mtime_ns"] == stat.st_mtime_ns
+
+
+def _ensure_cache(source: str):
+    directory = _cache_path(source)
+    manifest = _load_manifest(directory)
+    if _is_fresh(manifest, os.stat(source)):
+        return directory, manifest
+
+    # one builder at a time (API threads, the predictor, backtest workers); the
+    # others wait here and then find the cache the first one built
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with file_lock(f"{directory}.lock"):
+        stat = os.stat(source)
+        manifest = _load_manifest(directory)
+        if _is_fresh(manifest, stat):
+            return directory, manifest
+
+        # size/mtime changed (or no cache yet): only the content hash decides
+        sha1 = file_sha1(source)
+        if manifest and manifest["sha1"] == sha1:
+            manifest["mtime_ns"] = stat.st_mtime_ns
+            _write_manifest(directory, manifest)
+            return directory, manifest
+
+        return directory, _build(source, directory, sha1, stat)
+
+
+def _load(source: str, prefix: str, start, end) -> pd.DataFrame:
+    for attempt in range(2):
+        directory, manifest = _ensure_cache(source)
+        try:
+            return _read_frame(directory, prefix, manifest[f"columns_{prefix}"], manifest["tz"],
+                               manifest["index_name"], start, end)
+        except FileNotFoundError:
+            # a rebuild swapped the cache out between the manifest and the columns
+            if attempt:
+                raise
+
+
+def load_minute_bars(source: str, start=None, end=None) -> pd.DataFrame:
+    """
+    1-minute bars of `source` in [start, end), read from the columnar cache
+    (built on first use). Pass a range when only part is needed, e.g. one day,
+    rather than loading everything and filtering.
+    """
+    return _load(source, "1min", start, end)
+
+
+def load_5min_bars(source: str, start=None, end=None) -> pd.DataFrame:
+    """5-minute OHLCV aggregation of `source` in [start, end), precomputed alongside the 1-minute cache."""
+    return _load(source, "5min", start, end)
@@ -0,0 +1,141 @@
+import base64
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def _affine_params(scaler, n_features):
+    """
+    (mul, add) such that scaler.transform(x) == x * mul + add for a single row,
+    for the sklearn scalers we ship (StandardScaler / MinMaxScaler), honouring
+    with_mean/with_std. Returns (None, None) for anything else, including a
+    clipping MinMaxScaler, so we fall back to transform().
+    """
+    if hasattr(scaler, "with_mean") and hasattr(scaler, "with_std"):
+        mean = scaler.mean_ if scaler.with_mean else None
+        scale = scaler.scale_ if scaler.with_std else None
+        mean = np.zeros(n_features) if mean is None else np.asarray(mean, dtype=np.float64)
+        scale = np.ones(n_features) if scale is None else np.asarray(scale, dtype=np.float64)
+        return 1.0 / scale, -mean / scale
+    if hasattr(scaler, "min_") and hasattr(scaler, "scale_") and hasattr(scaler, "feature_range"):
+        if getattr(scaler, "clip", False):
+            return None, None
+        return np.asarray(scaler.scale_, dtype=np.float64), np.asarray(scaler.min_, dtype=np.float64)
+    return None, None
+
+
+class FeatureMatrix:
+    """
+    Scaled float32 feature history for one model's feature set.
+
+    Rows are scaled once when they are added (extend for history, append for
+    each new candle) and kept in one contiguous buffer; window()/windows()
+    hand out strided (TIME_STEPS, F) views into it without copying.
+    With max_rows set, the oldest rows are dropped once the buffer fills up,
+    so row positions are always relative to what is currently held.
+    """
+
+    def __init__(self, features, scaler, time_steps: int, max_rows: int = None):
+        self.features = list(features)
+        self.scaler = scaler
+        self.time_steps = time_steps
+        self.max_rows = max(max_rows, 2 * time_steps) if max_rows else None
+        self._mul, self._add = _affine_params(scaler, len(self.features))
+        self._data = np.empty((max(time_steps, 64), len(self.features)), dtype=np.float32)
+        self._len = 0
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, features, scaler, time_steps: int, max_rows: int = None):
+        matrix = cls(features, scaler, time_steps, max_rows=max_rows)
+        matrix.extend(df)
+        return matrix
+
+    def __len__(self):
+        return self._len
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._data[:self._len]
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes of the buffer, including reserved capacity."""
+        return int(self._data.nbytes)
+
+    def _reserve(self, n: int):
+        if self._len + n <= len(self._data):
+            return
+        if self.max_rows and self._len + n > self.max_rows:
+            # drop the oldest rows, keeping half the buffer so this stays amortized O(1)
+            keep = min(self._len, max(self.max_rows // 2, self.time_steps), self.max_rows - n)
+            self._data[:keep] = self._data[self._len - keep:self._len]
+            self._len = keep
+        needed = self._len + n
+        if needed <= len(self._data):
+            return
+        capacity = max(needed, 2 * len(self._data))
+        if self.max_rows:
+            capacity = max(min(capacity, self.max_rows), needed)
+        grown = np.empty((capacity, len(self.features)), dtype=np.float32)
+        grown[:self._len] = self._data[:self._len]
+        self._data = grown
+
+    def extend(self, df: pd.DataFrame):
+        """Scales a block of featured rows in one transform call and appends it."""
+        if df.empty:
+            return
+        # featured frames are float32; scale in float64 like append() does
+        scaled = self.scaler.transform(df[self.features].astype(np.float64))
+        if self.max_rows and len(scaled) > self.max_rows:
+            scaled = scaled[-self.max_rows:]
+        self._reserve(len(scaled))
+        self._data[self._len:self._len + len(scaled)] = scaled
+        self._len += len(scaled)
+
+    def append(self, row):
+        """Scales and appends a single featured row (dict or Series)."""
+        x = np.fromiter((row[f] for f in self.features), dtype=np.float64, count=len(self.features))
+        if self._mul is not None:
+            scaled = x * self._mul + self._add
+        else:
+            scaled = self.scaler.transform(pd.DataFrame([x], columns=self.features))[0]
+        self._reserve(1)
+        self._data[self._len] = scaled
+        self._len += 1
+
+    def tail_state(self, rows: int = None) -> dict:
+        """The newest `rows` scaled rows (a full window by default), base64 float32, for checkpoints."""
+        tail = self.values[-(rows or self.time_steps):]
+        return {"rows": len(tail), "data": base64.b64encode(np.ascontiguousarray(tail).tobytes()).decode()}
+
+    def restore_tail(self, state: dict):
+        """Replaces the buffer with rows saved by tail_state()."""
+        tail = np.frombuffer(base64.b64decode(state["data"]), dtype=np.float32).reshape(state["rows"], len(self.features))
+        self._len = 0
+        self._reserve(len(tail))
+        self._data[:len(tail)] = tail
+        self._len = len(tail)
+
+    def window(self, end: int = -1) -> np.ndarray:
+        """(TIME_STEPS, F) view of the rows ending at position `end` (inclusive)."""
+        if end < 0:
+            end += self._len
+        start = end - self.time_steps + 1
+        if start < 0 or end >= self._len:
+            raise IndexError(f"window ending at {end} needs {self.time_steps} rows, have {self._len}")
+        return self._data[start:end + 1]
+
+    def windows(self, ends=None) -> np.ndarray:
+        """
+        (N, TIME_STEPS, F) windows ending at each position in `ends` (all
+        complete windows if None). A contiguous range of ends stays a view.
+        """
+        all_windows = sliding_window_view(self.values, self.time_steps, axis=0).transpose(0, 2, 1)
+        if ends is None:
+            return all_windows
+        ends = np.asarray(ends)
+        offsets = ends - (self.time_steps - 1)
+        if len(offsets) and np.all(np.diff(offsets) == 1):
+            return all_windows[offsets[0]:offsets[-1] + 1]
+        return all_windows[offsets]
@@ -0,0 +1,269 @@
+import math
+from collections import deque
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+
+# Output order matches TrendPredict.add_features(df) on a 5-minute OHLCV frame
+FEATURE_COLUMNS = [
+    "open", "high", "low", "close", "volume",
+    "EMA_10", "EMA_30", "Boll_Upper", "Boll_Lower", "RSI", "ATR", "ADX",
+    "MACD", "MACD_Signal", "volatility", "RSI_change",
+    "hour_of_day", "day_of_week", "MA_short", "MA_long",
+]
+# Featured frames are kept in float32 (what the models consume); indicators are still computed in float64
+FEATURE_DTYPE = np.float32
+
+
+class _Ewm:
+    """
+    Recursive form of pandas' ``Series.ewm(alpha=..., adjust=...).mean()``
+    (same update rule pandas uses internally, ignore_na=False).
+    """
+    __slots__ = ("alpha", "adjust", "value", "old_wt")
+
+    def __init__(self, alpha: float, adjust: bool):
+        self.alpha = alpha
+        self.adjust = adjust
+        self.value = None
+        self.old_wt = 1.0
+
+    def update(self, x: float) -> float:
+        if self.value is None:
+            if x == x:
+                self.value = x
+                self.old_wt = 1.0
+            return math.nan if self.value is None else self.value
+
+        self.old_wt *= 1.0 - self.alpha
+        if x == x:
+            new_wt = 1.0 if self.adjust else self.alpha
+            if self.value != x:
+                self.value = (self.old_wt * self.value + new_wt * x) / (self.old_wt + new_wt)
+            self.old_wt = self.old_wt + new_wt if self.adjust else 1.0
+        return self.value
+
+    def get_state(self):
+        return [self.value, self.old_wt]
+
+    def set_state(self, state):
+        self.value, self.old_wt = state
+
+
+class _Rolling:
+    """
+    Fixed-size ring buffer with running (shifted) sum / sum of squares,
+    matching pandas ``rolling(n).mean()/.sum()/.std()`` once n values are in.
+    Sums are rebuilt from the buffer once per wrap to stop float drift.
+    """
+    __slots__ = ("n", "buf", "pos", "count", "shift", "s1", "s2")
+
+    def __init__(self, n: int):
+        self.n = n
+        self.buf = [0.0] * n
+        self.pos = 0
+        self.count = 0
+        self.shift = 0.0
+        self.s1 = 0.0
+        self.s2 = 0.0
+
+    def push(self, x: float):
+        if self.count == 0:
+            self.shift = x
+        if self.count >= self.n:
+            old = self.buf[self.pos] - self.shift
+            self.s1 -= old
+            self.s2 -= old * old
+        else:
+            self.count += 1
+        self.buf[self.pos] = x
+        d = x - self.shift
+        self.s1 += d
+        self.s2 += d * d
+        self.pos += 1
+        if self.pos == self.n:
+            self.pos = 0
+            if self.count == self.n:
+                self._resync()
+
+    def _resync(self):
+        self.shift = self.buf[self.pos - 1]
+        self.s1 = 0.0
+        self.s2 = 0.0
+        for v in self.buf:
+            d = v - self.shift
+            self.s1 += d
+            self.s2 += d * d
+
+    @property
+    def full(self) -> bool:
+        return self.count == self.n
+
+    def sum(self) -> float:
+        if self.count < self.n:
+            return math.nan
+        return self.s1 + self.shift * self.n
+
+    def mean(self) -> float:
+        if self.count < self.n:
+            return math.nan
+        return self.s1 / self.n + self.shift
+
+    def std(self) -> float:
+        if self.count < self.n:
+            return math.nan
+        var = (self.s2 - self.s1 * self.s1 / self.n) / (self.n - 1)
+        return math.sqrt(var) if var > 0 else 0.0
+
+    def get_state(self):
+        return [self.buf[:], self.pos, self.count, self.shift, self.s1, self.s2]
+
+    def set_state(self, state):
+        buf, self.pos, self.count, self.shift, self.s1, self.s2 = state
+        self.buf = list(buf)
+
+
+class StreamingFeatures:
+    """
+    Stateful, constant-time-per-candle version of TrendPredict.add_features.
+
+    Feed closed 5-minute candles in order through update(); it returns the
+    featured row as a dict (same columns as add_features) or None while the
+    longest window (MA_long, 50 bars) is still warming up - i.e. exactly the
+    rows add_features would drop with dropna().
+    """
+
+    _EWMS = ("ema_10", "ema_30", "ema_12", "ema_26", "macd_signal", "plus_dm", "minus_dm", "adx")
+    _ROLLINGS = ("close_20", "gain_14", "loss_14", "tr_14", "returns_20", "close_10", "close_50")
+
+    def __init__(self):
+        self.ema_10 = _Ewm(2 / 11, adjust=False)
+        self.ema_30 = _Ewm(2 / 31, adjust=False)
+        self.ema_12 = _Ewm(2 / 13, adjust=False)
+        self.ema_26 = _Ewm(2 / 27, adjust=False)
+        self.macd_signal = _Ewm(2 / 10, adjust=False)
+        self.plus_dm = _Ewm(1 / 14, adjust=True)
+        self.minus_dm = _Ewm(1 / 14, adjust=True)
+        self.adx = _Ewm(1 / 14, adjust=True)
+
+        self.close_20 = _Rolling(20)
+        self.gain_14 = _Rolling(14)
+        self.loss_14 = _Rolling(14)
+        self.tr_14 = _Rolling(14)
+        self.returns_20 = _Rolling(20)
+        self.close_10 = _Rolling(10)
+        self.close_50 = _Rolling(50)
+
+        self.rsi_history = deque([math.nan] * 6, maxlen=6)
+        self.prev_high = None
+        self.prev_low = None
+        self.prev_close = None
+        self.last_timestamp = None
+
+    def update(self, timestamp, open, high, low, close, volume) -> Optional[Dict[str, float]]:
+        prev_close = self.prev_close
+        first = prev_close is None
+
+        ema_10 = self.ema_10.update(close)
+        ema_30 = self.ema_30.update(close)
+        self.close_20.push(close)
+        self.close_10.push(close)
+        self.close_50.push(close)
+
+        # RSI (simple 14-bar means of gains/losses, first delta counts as 0)
+        delta = 0.0 if first else close - prev_close
+        self.gain_14.push(delta if delta > 0 else 0.0)
+        self.loss_14.push(-delta if delta < 0 else 0.0)
+        rsi = 100 - (100 / (1 + self.gain_14.mean() / (self.loss_14.mean() + 1e-9)))
+        self.rsi_history.append(rsi)
+
+        # ATR
+        if first:
+            tr = high - low
+        else:
+            tr = max(high - low, abs(high - prev_close), abs(low - prev_close))
+        self.tr_14.push(tr)
+
+        # ADX
+        if first:
+            plus_dm = minus_dm = math.nan
+        else:
+            plus_dm = max(high - self.prev_high, 0.0)
+            minus_dm = max(self.prev_low - low, 0.0)
+        tr14 = self.tr_14.sum()
+        plus_di = 100 * (self.plus_dm.update(plus_dm) / (tr14 + 1e-9))
+        minus_di = 100 * (self.minus_dm.update(minus_dm) / (tr14 + 1e-9))
+        dx = 100 * abs(plus_di - minus_di) / (plus_di + minus_di + 1e-9)
+        adx = self.adx.update(dx)
+
+        # MACD
+        macd = self.ema_12.update(close) - self.ema_26.update(close)
+        macd_signal = self.macd_signal.update(macd)
+
+        if not first:
+            self.returns_20.push(close / prev_close - 1)
+
+        self.prev_high, self.prev_low, self.prev_close = high, low, close
+        self.last_timestamp = timestamp
+
+        if not self.close_50.full:
+            return None
+
+        boll_mid = self.close_20.mean()
+        boll_std = self.close_20.std()
+        return {
+            "open": open, "high": high, "low": low, "close": close, "volume": volume,
+            "EMA_10": ema_10,
+            "EMA_30": ema_30,
+            "Boll_Upper": boll_mid + boll_std * 2,
+            "Boll_Lower": boll_mid - boll_std * 2,
+            "RSI": rsi,
+            "ATR": self.tr_14.mean(),
+            "ADX": adx,
+            "MACD": macd,
+            "MACD_Signal": macd_signal,
+            "volatility": self.returns_20.std(),
+            "RSI_change": rsi - self.rsi_history[0],
+            "hour_of_day": timestamp.hour,
+            "day_of_week": timestamp.weekday(),
+            "MA_short": self.close_10.mean(),
+            "MA_long": self.close_50.mean(),
+        }
+
+    def get_state(self) -> dict:
+        """Everything update() depends on, JSON-serializable (see set_state)."""
+        return {
+            "ewm": {name: getattr(self, name).get_state() for name in self._EWMS},
+            "rolling": {name: getattr(self, name).get_state() for name in self._ROLLINGS},
+            "rsi_history": list(self.rsi_history),
+            "prev": [self.prev_high, self.prev_low, self.prev_close],
+            "last_timestamp": self.last_timestamp.isoformat() if self.last_timestamp is not None else None,
+        }
+
+    def set_state(self, state: dict):
+        for name in self._EWMS:
+            getattr(self, name).set_state(state["ewm"][name])
+        for name in self._ROLLINGS:
+            getattr(self, name).set_state(state["rolling"][name])
+        self.rsi_history = deque(state["rsi_history"], maxlen=6)
+        self.prev_high, self.prev_low, self.prev_close = state["prev"]
+        self.last_timestamp = pd.Timestamp(state["last_timestamp"]) if state["last_timestamp"] else None
+
+    def update_frame(self, df: pd.DataFrame, last: int = None) -> pd.DataFrame:
+        """
+        Streams every row of an OHLCV frame; returns the warm rows (only the
+        newest `last` of them if given, e.g. just what a window buffer keeps)
+        as a float32 frame.
+        """
+        rows, index = deque(maxlen=last), deque(maxlen=last)
+        for ts, o, h, l, c, v in zip(df.index, df["open"].values, df["high"].values,
+                                     df["low"].values, df["close"].values, df["volume"].values):
+            row = self.update(ts, float(o), float(h), float(l), float(c), float(v))
+            if row is not None:
+                rows.append(tuple(row.values()))
+                index.append(ts)
+        values = np.array(rows, dtype=FEATURE_DTYPE).reshape(len(rows), len(FEATURE_COLUMNS))
+        return pd.DataFrame(values, index=pd.DatetimeIndex(list(index), name=df.index.name),
+                            columns=FEATURE_COLUMNS)
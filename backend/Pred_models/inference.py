@@ -0,0 +1,161 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+from Pred_models.metrics import inference_seconds
+
+# TensorFlow is imported only by the backends that run Keras graphs, so TFLite
+# workers start (and stay) without it, and the slim image doesn't ship it.
+
+
+def _tflite_interpreter_class():
+    """Standalone LiteRT / tflite-runtime if installed, else the one bundled with tensorflow."""
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    try:
+        from tflite_runtime.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    try:
+        import tensorflow as tf
+    except ImportError:
+        raise RuntimeError("No TFLite runtime installed (ai-edge-litert, tflite-runtime or tensorflow).")
+    return tf.lite.Interpreter
+
+
+def tflite_path(h5_path: str, quantized: bool = False) -> str:
+    """Where convert_models writes the TFLite version of a .h5 model."""
+    return os.path.splitext(h5_path)[0] + ("_quant.tflite" if quantized else ".tflite")
+
+
+class KerasPredictBackend:
+    """Plain model.predict() on both models (the original per-candle path)."""
+    name = "keras"
+
+    def __init__(self, models):
+        self.price_model = models['price_lstm']
+        self.trend_model = models['trend']
+        self.input_shapes = (tuple(self.price_model.input_shape[1:]), tuple(self.trend_model.input_shape[1:]))
+
+    def predict(self, X_price, X_trend, batch_size: int = 256):
+        """Returns (scaled price predictions, trend probabilities), each shape (N,)."""
+        with inference_seconds.time(backend=self.name, model="price_lstm"):
+            price_preds = self.price_model.predict(X_price, batch_size=batch_size, verbose=0)[:, 0]
+        with inference_seconds.time(backend=self.name, model="trend"):
+            trend_probs = self.trend_model.predict(X_trend, batch_size=batch_size, verbose=0)[:, 0]
+        return price_preds, trend_probs
+
+
+class CompiledBackend:
+    """
+    Both models fused into one tf.function with a fixed (None, TIME_STEPS, F)
+    float32 signature, so repeated calls of any batch size never retrace and
+    skip the dataset/callback machinery of model.predict().
+    """
+    name = "compiled"
+
+    def __init__(self, models):
+        import tensorflow as tf
+
+        self.price_model = models['price_lstm']
+        self.trend_model = models['trend']
+        self.input_shapes = (tuple(self.price_model.input_shape[1:]), tuple(self.trend_model.input_shape[1:]))
+        self._tf = tf
+        self._forward = tf.function(
+            self._fused,
+            input_signature=[
+                tf.TensorSpec((None,) + tuple(self.price_model.input_shape[1:]), tf.float32),
+                tf.TensorSpec((None,) + tuple(self.trend_model.input_shape[1:]), tf.float32),
+            ],
+        )
+
+    def _fused(self, x_price, x_trend):
+        return self.price_model(x_price, training=False), self.trend_model(x_trend, training=False)
+
+    def predict(self, X_price, X_trend, batch_size: int = 256):
+        tf = self._tf
+        price_out, trend_out = [], []
+        # both models run inside one graph, so they can only be timed together
+        with inference_seconds.time(backend=self.name, model="price_lstm+trend"):
+            for start in range(0, len(X_price), batch_size):
+                price_pred, trend_prob = self._forward(
+                    tf.convert_to_tensor(X_price[start:start + batch_size], dtype=tf.float32),
+                    tf.convert_to_tensor(X_trend[start:start + batch_size], dtype=tf.float32),
+                )
+                price_out.append(price_pred.numpy()[:, 0])
+                trend_out.append(trend_prob.numpy()[:, 0])
+        return np.concatenate(price_out), np.concatenate(trend_out)
+
+
+class TFLiteModel:
+    """One converted .tflite model; run() takes a single (TIME_STEPS, F) window and returns its output."""
+
+    def __init__(self, path: str, num_threads: int = None):
+        self.interpreter = _tflite_interpreter_class()(model_path=path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self.input = self.interpreter.get_input_details()[0]
+        self.output = self.interpreter.get_output_details()[0]
+
+    def run(self, x) -> float:
+        self.interpreter.set_tensor(self.input['index'], np.asarray(x, dtype=np.float32)[None])
+        self.interpreter.invoke()
+        return float(self.interpreter.get_tensor(self.output['index'])[0, 0])
+
+
+class TFLiteBackend:
+    """
+    Both models on the TFLite interpreter (files produced by convert_models),
+    no Keras/TensorFlow needed at runtime. Converted LSTMs have a fixed batch
+    of 1, so batches are run window by window; interpreters aren't
+    thread-safe, hence the lock.
+    """
+    name = "tflite"
+
+    def __init__(self, price_path: str, trend_path: str, num_threads: int = None, name: str = "tflite"):
+        self.name = name
+        self.price_model = TFLiteModel(price_path, num_threads)
+        self.trend_model = TFLiteModel(trend_path, num_threads)
+        self.input_shapes = (tuple(self.price_model.input['shape'][1:]), tuple(self.trend_model.input['shape'][1:]))
+        self._lock = threading.Lock()
+
+    def predict(self, X_price, X_trend, batch_size: int = 256):
+        with self._lock:
+            with inference_seconds.time(backend=self.name, model="price_lstm"):
+                price_preds = np.array([self.price_model.run(x) for x in X_price], dtype=np.float32)
+            with inference_seconds.time(backend=self.name, model="trend"):
+                trend_probs = np.array([self.trend_model.run(x) for x in X_trend], dtype=np.float32)
+        return price_preds, trend_probs
+
+
+BACKENDS = {
+    KerasPredictBackend.name: KerasPredictBackend,
+    CompiledBackend.name: CompiledBackend,
+    "tflite": TFLiteBackend,
+    "tflite_quant": TFLiteBackend,
+}
+# Backends that run the Keras models themselves (the others only need the converted files)
+KERAS_BACKENDS = (KerasPredictBackend.name, CompiledBackend.name)
+
+
+def create_backend(name: str, models=None, price_path: str = None, trend_path: str = None):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{name}'. Choose from {list(BACKENDS)}.")
+    if name in KERAS_BACKENDS:
+        return BACKENDS[name](models)
+    quantized = name == "tflite_quant"
+    return TFLiteBackend(tflite_path(price_path, quantized), tflite_path(trend_path, quantized), name=name)
+
+
+def measure_latency(backend, X_price, X_trend, repeats: int = 20) -> float:
+    """Mean milliseconds per predict() call on the given inputs (after one untimed call)."""
+    backend.predict(X_price, X_trend)
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        backend.predict(X_price, X_trend)
+    return (time.perf_counter() - t0) / repeats * 1000
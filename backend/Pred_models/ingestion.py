@@ -0,0 +1,224 @@
+"""
+Minute-bar ingestion for the live predictor.
+
+A source yields closed 1-minute bars as (ticker, timestamp, bar) tuples, from
+a replayed day, a CSV that is being appended to, or a Redis stream. The
+CandleAggregator folds them into 5-minute OHLCV candles (first/max/min/last/sum,
+the same buckets as resample('5T')) and hands back each candle the moment it
+is complete, so the predictor never re-reads or re-resamples history.
+"""
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from Pred_models.data_cache import load_minute_bars
+from Pred_models.clock import clock as default_clock
+from database.redisClient import redis_client
+
+Bar = Tuple[str, pd.Timestamp, dict]
+
+# Where feeders publish minute bars for RedisStreamSource
+BAR_STREAM_PATTERN = "bars:{ticker}:1min"
+BAR_STREAM_MAXLEN = 10000
+
+
+class CandleAggregator:
+    """Incremental minute -> N-minute OHLCV candles for any number of tickers."""
+
+    def __init__(self, minutes: int = 5, bar_minutes: int = 1):
+        self.freq = pd.Timedelta(minutes=minutes)
+        self.bar = pd.Timedelta(minutes=bar_minutes)
+        self._open: Dict[str, Tuple[pd.Timestamp, dict]] = {}
+
+    def add(self, ticker: str, timestamp: pd.Timestamp, bar: dict) -> List[Bar]:
+        """
+        Folds one bar in; returns the candles it closed: the previous bucket if
+        this bar starts a new one, and this bucket if the bar is its last minute.
+        """
+        closed = []
+        start = timestamp.floor(self.freq)
+        current = self._open.get(ticker)
+        if current is not None and current[0] != start:
+            if start < current[0]:
+                return closed  # late bar for a candle already emitted
+            closed.append((ticker, *self._open.pop(ticker)))
+            current = None
+
+        if current is None:
+            self._open[ticker] = (start, {
+                "open": float(bar["open"]), "high": float(bar["high"]), "low": float(bar["low"]),
+                "close": float(bar["close"]), "volume": float(bar["volume"]),
+            })
+        else:
+            candle = current[1]
+            candle["high"] = max(candle["high"], float(bar["high"]))
+            candle["low"] = min(candle["low"], float(bar["low"]))
+            candle["close"] = float(bar["close"])
+            candle["volume"] += float(bar["volume"])
+
+        if timestamp + self.bar >= start + self.freq:
+            closed.append((ticker, *self._open.pop(ticker)))
+        return closed
+
+    def close_due(self, watermark: pd.Timestamp) -> List[Bar]:
+        """Closes the candles of tickers that went quiet once any data reaches past their end."""
+        due = [t for t, (start, _) in self._open.items() if start + self.freq <= watermark]
+        return [(t, *self._open.pop(t)) for t in due]
+
+    def flush(self) -> List[Bar]:
+        """Closes every open candle (end of the feed)."""
+        closed = [(t, *candle) for t, candle in self._open.items()]
+        self._open.clear()
+        return closed
+
+
+class ReplaySource:
+    """
+    Replays minute bars of one day per ticker in timestamp order. With
+    seconds_per_bar set, bars are paced on `clock` (60 is real time on the
+    real clock, 1 bar per second on a 60x one); otherwise as fast as they are read.
+    """
+
+    def __init__(self, frames: Dict[str, pd.DataFrame], seconds_per_bar: float = None, clock=None):
+        stacked = [df.assign(ticker=ticker) for ticker, df in frames.items() if not df.empty]
+        self.bars = pd.concat(stacked).sort_index(kind="stable") if stacked else pd.DataFrame()
+        self.seconds_per_bar = seconds_per_bar
+        self.clock = clock or default_clock
+        self._timestamps = self.bars.index.unique() if len(self.bars) else []
+        self._pos = 0
+
+    @classmethod
+    def for_day(cls, data_files: Dict[str, str], day: str, seconds_per_bar: float = None, clock=None):
+        start = pd.Timestamp(day).normalize()
+        frames = {ticker: load_minute_bars(path, start, start + pd.Timedelta(days=1))
+                  for ticker, path in data_files.items()}
+        return cls(frames, seconds_per_bar, clock)
+
+    def read(self, timeout: float = 1.0) -> Optional[List[Bar]]:
+        if self._pos >= len(self._timestamps):
+            return None
+        if self.seconds_per_bar:
+            self.clock.sleep(self.seconds_per_bar)
+        ts = self._timestamps[self._pos]
+        self._pos += 1
+        rows = self.bars.loc[[ts]]
+        return [(row.ticker, ts, row._asdict()) for row in rows.itertuples(index=False)]
+
+
+class CsvTailSource:
+    """
+    Follows minute-bar CSVs (date,open,high,low,close,volume) that another
+    process appends to, returning only rows written since the last read and
+    at or after `start`. On first open the file is bisected on byte offsets
+    to the first row at or after `start` (or skipped to its end without one),
+    so the history before it is never read or parsed.
+    """
+
+    def __init__(self, paths: Dict[str, str], start: pd.Timestamp = None):
+        self.paths = dict(paths)
+        self.start = start
+        self._offsets: Dict[str, int] = {}
+        self._header = {}
+
+    @staticmethod
+    def _next_line(f, pos: int, floor: int) -> Tuple[int, Optional[bytes]]:
+        """Start of the first line at or after byte `pos` (>= floor) and that line, None if incomplete."""
+        if pos > floor:
+            f.seek(pos - 1)
+            f.readline()  # finishes the line `pos` falls in (nothing if pos starts a line)
+        else:
+            f.seek(floor)
+        start = f.tell()
+        line = f.readline()
+        return start, line if line.endswith(b"\n") else None
+
+    def _open(self, ticker: str, f) -> Optional[int]:
+        """Reads the header; returns the offset of the first row to follow, None until the header is complete."""
+        header = f.readline()
+        if not header.endswith(b"\n"):
+            return None
+        self._header[ticker] = header.decode().strip().split(",")
+        floor = f.tell()
+        date_col = self._header[ticker].index("date")
+        # without a start every complete row is history: the search lands on the end of the last one
+        lo, hi = floor, os.fstat(f.fileno()).st_size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            line_start, line = self._next_line(f, mid, floor)
+            if line is None or (self.start is not None
+                                and pd.Timestamp(line.decode().split(",")[date_col]) >= self.start):
+                hi = mid
+            else:
+                lo = line_start + len(line)
+        return self._next_line(f, lo, floor)[0]
+
+    def _read_new(self, ticker: str) -> List[Bar]:
+        path = self.paths[ticker]
+        if not os.path.exists(path):
+            return []
+        with open(path, "rb") as f:
+            if ticker not in self._offsets:
+                offset = self._open(ticker, f)
+                if offset is None:
+                    return []
+                self._offsets[ticker] = offset
+            f.seek(self._offsets[ticker])
+            chunk = f.read()
+        # only consume complete lines; a half-written one is picked up next time
+        end = chunk.rfind(b"\n") + 1
+        self._offsets[ticker] += end
+
+        bars = []
+        for line in chunk[:end].decode().splitlines():
+            if not line.strip():
+                continue
+            row = dict(zip(self._header[ticker], line.strip().split(",")))
+            ts = pd.Timestamp(row.pop("date"))
+            if self.start is None or ts >= self.start:
+                bars.append((ticker, ts, row))
+        return bars
+
+    def read(self, timeout: float = 1.0) -> List[Bar]:
+        bars = [bar for ticker in self.paths for bar in self._read_new(ticker)]
+        if not bars:
+            time.sleep(timeout)
+        return sorted(bars, key=lambda b: b[1])
+
+
+class RedisStreamSource:
+    """Reads minute bars published with publish_bar() to bars:{ticker}:1min streams."""
+
+    def __init__(self, tickers: List[str], client=redis_client, last_id: str = "$"):
+        self.client = client
+        self.streams = {BAR_STREAM_PATTERN.format(ticker=t): last_id for t in tickers}
+        self._tickers = {BAR_STREAM_PATTERN.format(ticker=t): t for t in tickers}
+
+    def read(self, timeout: float = 1.0) -> List[Bar]:
+        response = self.client.xread(self.streams, block=int(timeout * 1000)) or []
+        bars = []
+        for stream, entries in response:
+            for entry_id, fields in entries:
+                self.streams[stream] = entry_id
+                fields = dict(fields)
+                bars.append((self._tickers[stream], pd.Timestamp(fields.pop("date")), fields))
+        return sorted(bars, key=lambda b: b[1])
+
+
+def publish_bar(ticker: str, timestamp, bar: dict, client=redis_client):
+    """Feeder side of RedisStreamSource: appends one closed minute bar."""
+    fields = {"date": pd.Timestamp(timestamp).isoformat(),
+              **{k: float(bar[k]) for k in ("open", "high", "low", "close", "volume")}}
+    client.xadd(BAR_STREAM_PATTERN.format(ticker=ticker), fields, maxlen=BAR_STREAM_MAXLEN, approximate=True)
+
+
+def make_source(kind: str, data_files: Dict[str, str], day: str, seconds_per_bar: float = None, clock=None):
+    """Source for PREDICTOR_SOURCE=replay|csv|redis; data_files maps ticker -> minute CSV."""
+    if kind == "replay":
+        return ReplaySource.for_day(data_files, day, seconds_per_bar, clock)
+    if kind == "csv":
+        return CsvTailSource(data_files, start=pd.Timestamp(day))
+    if kind == "redis":
+        return RedisStreamSource(list(data_files))
+    raise ValueError(f"Unknown bar source '{kind}'. Choose from replay, csv, redis.")
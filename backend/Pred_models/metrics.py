@@ -0,0 +1,133 @@
+"""
+Latency histograms for the prediction pipeline, rendered in the Prometheus
+text format by GET /metrics.
+
+Each process records into the module-level `metrics` registry. A predictor
+running in another process (predictor_worker.py) publishes snapshots to Redis
+under metrics:snapshot:{worker_id}, and the API merges them into its output,
+with every series labeled by worker.
+"""
+import json
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; spans feature updates (~ms) up to a full history reload
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+SNAPSHOT_PATTERN = "metrics:snapshot:{worker_id}"
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            series = [[list(key), list(counts), total, count] for key, (counts, total, count) in self._series.items()]
+        return {"help": self.help, "labelnames": list(self.labelnames), "buckets": list(self.buckets), "series": series}
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, help: str, labelnames, buckets=DEFAULT_BUCKETS) -> Histogram:
+        with self._lock:
+            if name not in self._histograms:
+                self._histograms[name] = Histogram(name, help, labelnames, buckets)
+            return self._histograms[name]
+
+    def snapshot(self) -> dict:
+        return {name: h.snapshot() for name, h in list(self._histograms.items())}
+
+    def publish(self, client, ttl_seconds: int = 900):
+        """Makes this process's metrics visible to the API's /metrics."""
+        client.set(SNAPSHOT_PATTERN.format(worker_id=WORKER_ID), json.dumps(self.snapshot()), ex=ttl_seconds)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values) -> str:
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def render(snapshots: dict) -> str:
+    """Prometheus text exposition of {worker_id: snapshot}."""
+    merged = {}
+    for worker, snapshot in snapshots.items():
+        for name, hist in snapshot.items():
+            merged.setdefault(name, (hist, []))[1].append((worker, hist))
+
+    lines = []
+    for name in sorted(merged):
+        meta, parts = merged[name]
+        lines.append(f"# HELP {name} {meta['help']}")
+        lines.append(f"# TYPE {name} histogram")
+        for worker, hist in parts:
+            names = ["worker"] + hist["labelnames"]
+            for key, counts, total, count in hist["series"]:
+                values = [worker] + key
+                for bound, bucket_count in zip(hist["buckets"], counts):
+                    lines.append(f"{name}_bucket{_labels(names + ['le'], values + [repr(float(bound))])} {bucket_count}")
+                lines.append(f"{name}_bucket{_labels(names + ['le'], values + ['+Inf'])} {count}")
+                lines.append(f"{name}_sum{_labels(names, values)} {total}")
+                lines.append(f"{name}_count{_labels(names, values)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def collect(client=None) -> str:
+    """This process's metrics plus every snapshot other processes published to Redis."""
+    snapshots = {WORKER_ID: metrics.snapshot()}
+    if client is not None:
+        try:
+            keys = [k for k in client.scan_iter(match=SNAPSHOT_PATTERN.format(worker_id="*"))
+                    if k != SNAPSHOT_PATTERN.format(worker_id=WORKER_ID)]
+            for key, value in zip(keys, client.mget(keys) if keys else []):
+                if value:
+                    snapshots[key.split(":", 2)[2]] = json.loads(value)
+        except Exception as e:
+            print(f"[metrics] Could not read published snapshots: {e}")
+    return render(snapshots)
+
+
+metrics = MetricsRegistry()
+
+# Pipeline stages: data_load, add_features, scaling, persist
+stage_seconds = metrics.histogram(
+    "predictor_stage_seconds", "Time spent per prediction pipeline stage.", ["stage", "ticker"])
+inference_seconds = metrics.histogram(
+    "predictor_inference_seconds", "Model forward pass time per predict() call.", ["backend", "model"])
+publish_lag_seconds = metrics.histogram(
+    "predictor_publish_lag_seconds", "Time from candle close to the prediction being saved.", ["ticker"])
@@ -0,0 +1,100 @@
+import os
+import pickle
+import threading
+import time
+
+import numpy as np
+
+
+def _footprint(obj) -> int:
+    """Approximate in-memory size: model weights, or the numpy arrays an object holds."""
+    if hasattr(obj, "get_weights"):
+        return int(sum(w.nbytes for w in obj.get_weights()))
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    if isinstance(obj, dict):
+        return sum(_footprint(v) for v in obj.values())
+    if hasattr(obj, "__dict__"):
+        return sum(int(v.nbytes) for v in vars(obj).values() if isinstance(v, np.ndarray))
+    return 0
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of models and pickled scalers.
+
+    Every artifact is loaded once per process and shared by all callers (the
+    background predictor, /trend simulations, backtests); loads are guarded
+    by a lock so concurrent first calls don't load the same file twice.
+    """
+
+    def __init__(self):
+        self._artifacts = {}
+        self._stats = {}
+        self._latency = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key, loader):
+        artifact = self._artifacts.get(key)
+        if artifact is not None:
+            return artifact
+        with self._lock:
+            artifact = self._artifacts.get(key)
+            if artifact is None:
+                t0 = time.perf_counter()
+                artifact = loader()
+                self._stats[key] = {
+                    "path": key[0],
+                    "load_seconds": round(time.perf_counter() - t0, 4),
+                    "file_bytes": os.path.getsize(key[0]) if os.path.exists(key[0]) else None,
+                    "memory_bytes": _footprint(artifact),
+                    "warmup_seconds": None,
+                }
+                self._artifacts[key] = artifact
+                print(f"[ModelRegistry] Loaded {key[0]} in {self._stats[key]['load_seconds']}s")
+        return artifact
+
+    def get_model(self, path: str, compile: bool = True):
+        def _load():
+            # imported here so processes that only use TFLite never load TensorFlow
+            from tensorflow.keras.models import load_model
+            return load_model(path, compile=compile)
+        return self._get((path, "model", compile), _load)
+
+    def get_pickle(self, path: str):
+        def _load():
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        return self._get((path, "pickle", None), _load)
+
+    def get_backend(self, name: str, factory):
+        """Shared inference backend (e.g. a compiled function) built once per name."""
+        return self._get((name, "backend", None), factory)
+
+    def record_latency(self, backend_name: str, ms_per_call: float):
+        self._latency[backend_name] = round(ms_per_call, 3)
+
+    def warm_up(self, path: str, compile: bool = True):
+        """
+        Runs one dummy inference so graph building happens now rather than
+        on the first real prediction. Only the first call per model does work.
+        """
+        key = (path, "model", compile)
+        model = self.get_model(path, compile=compile)
+        if self._stats[key]["warmup_seconds"] is not None:
+            return
+        t0 = time.perf_counter()
+        dummy = np.zeros((1,) + tuple(model.input_shape[1:]), dtype=np.float32)
+        model.predict(dummy, verbose=0)
+        self._stats[key]["warmup_seconds"] = round(time.perf_counter() - t0, 4)
+        print(f"[ModelRegistry] Warmed up {path} in {self._stats[key]['warmup_seconds']}s")
+
+    def stats(self) -> dict:
+        return {
+            "artifacts": list(self._stats.values()),
+            "total_memory_bytes": sum(s["memory_bytes"] for s in self._stats.values()),
+            "inference_ms_per_candle": dict(self._latency),
+        }
+
+
+registry = ModelRegistry()
@@ -0,0 +1,440 @@
+import asyncio
+import json
+import os
+import socket
+from collections import deque
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from Pred_models.trend_pred_new import TrendPredict
+from Pred_models.indicators import StreamingFeatures
+from Pred_models.feature_matrix import FeatureMatrix
+from Pred_models.scheduler import CandleScheduler
+from Pred_models.clock import clock as default_clock
+from Pred_models.ingestion import CandleAggregator, make_source
+from Pred_models.candle_pyramid import get_pyramid
+from Pred_models.metrics import metrics, stage_seconds, publish_lag_seconds
+from Pred_models.accuracy import AccuracyTracker
+from database.redisClient import redis_client
+from database.predictionStore import prediction_store, prediction_field
+from database.checkpointStore import checkpoint_store, PREDICTOR_CHECKPOINTS
+from database.redisLease import RedisLease, run_while_leader
+
+# Comma-separated watchlist served by the predictor (in the API process or predictor_worker.py)
+PREDICTOR_TICKERS = [t.strip() for t in os.getenv("PREDICTOR_TICKERS", "TATAMOTORS").split(",") if t.strip()]
+# Seconds to wait after each 5-minute candle closes before predicting (lets the last ticks arrive)
+PREDICTOR_SETTLE_SECONDS = float(os.getenv("PREDICTOR_SETTLE_SECONDS", "2"))
+# "skip" drops candle closes missed while busy, "catch_up" replays them back to back
+PREDICTOR_MISSED_TICKS = os.getenv("PREDICTOR_MISSED_TICKS", "skip")
+# Processes serving the same shard elect one leader through a Redis lease; the others stand by
+PREDICTOR_SHARD = os.getenv("PREDICTOR_SHARD")
+PREDICTOR_LEASE_SECONDS = float(os.getenv("PREDICTOR_LEASE_SECONDS", "15"))
+# Empty: replay TARGET_DAY one candle per scheduler tick. replay | csv | redis: predict off streamed minute bars
+PREDICTOR_SOURCE = os.getenv("PREDICTOR_SOURCE", "") or None
+# Pacing of PREDICTOR_SOURCE=replay in PREDICTOR_CLOCK seconds (60 = one bar a minute); unset replays as fast as possible
+PREDICTOR_REPLAY_SECONDS_PER_BAR = float(os.getenv("PREDICTOR_REPLAY_SECONDS_PER_BAR", "0")) or None
+
+
+class _TickerState:
+    """Streaming indicators plus scaled window buffers for one symbol."""
+
+    def __init__(self, predictor: TrendPredict, scalers, trend_features):
+        self.predictor = predictor
+        self.features = StreamingFeatures()
+        self.max_rows = max_rows = 4 * predictor.TIME_STEPS
+        self.price_matrix = FeatureMatrix(predictor.PRICE_FEATURES, scalers['price'], predictor.TIME_STEPS, max_rows)
+        self.trend_matrix = FeatureMatrix(trend_features, scalers['trend'], predictor.TIME_STEPS, max_rows)
+        self.last_row = None
+
+    def warm_up(self, history_5min: pd.DataFrame):
+        ticker = self.predictor.TICKER
+        with stage_seconds.time(stage="add_features", ticker=ticker):
+            featured = self.features.update_frame(history_5min, last=self.max_rows)
+        with stage_seconds.time(stage="scaling", ticker=ticker):
+            self.price_matrix.extend(featured)
+            self.trend_matrix.extend(featured)
+
+    def update(self, timestamp, candle) -> bool:
+        """Feeds one closed candle; True if a full window is ready to predict on."""
+        ticker = self.predictor.TICKER
+        with stage_seconds.time(stage="add_features", ticker=ticker):
+            row = self.features.update(
+                timestamp, float(candle["open"]), float(candle["high"]),
+                float(candle["low"]), float(candle["close"]), float(candle["volume"])
+            )
+        if row is None:
+            return False
+        with stage_seconds.time(stage="scaling", ticker=ticker):
+            self.price_matrix.append(row)
+            self.trend_matrix.append(row)
+        self.last_row = row
+        return len(self.price_matrix) >= self.predictor.TIME_STEPS
+
+    @property
+    def last_timestamp(self):
+        return self.features.last_timestamp
+
+    def is_new(self, timestamp) -> bool:
+        """False for candles this state has already consumed (e.g. before a restart)."""
+        return self.last_timestamp is None or timestamp > self.last_timestamp
+
+    def catch_up(self, bars_5min: pd.DataFrame):
+        """Feeds the candles after last_timestamp without predicting on them."""
+        for timestamp, candle in bars_5min[bars_5min.index > self.last_timestamp].iterrows():
+            self.update(timestamp, candle)
+
+    def get_state(self) -> dict:
+        return {
+            "time_steps": self.predictor.TIME_STEPS,
+            "price_features": self.price_matrix.features,
+            "trend_features": self.trend_matrix.features,
+            "features": self.features.get_state(),
+            "last_row": self.last_row,
+            "price_tail": self.price_matrix.tail_state(),
+            "trend_tail": self.trend_matrix.tail_state(),
+        }
+
+    def compatible(self, state: dict) -> bool:
+        """Whether a checkpoint was written for the same window length and feature sets."""
+        return (state.get("time_steps") == self.predictor.TIME_STEPS
+                and state.get("price_features") == self.price_matrix.features
+                and state.get("trend_features") == self.trend_matrix.features)
+
+    def set_state(self, state: dict):
+        self.features.set_state(state["features"])
+        self.last_row = state["last_row"]
+        self.price_matrix.restore_tail(state["price_tail"])
+        self.trend_matrix.restore_tail(state["trend_tail"])
+
+    def nbytes(self) -> int:
+        return self.price_matrix.nbytes + self.trend_matrix.nbytes
+
+
+class PredictorService:
+    """
+    Runs one shared pair of models over a whole watchlist.
+
+    At every candle close the windows of all tickers that have enough history
+    are stacked into one (N, TIME_STEPS, F) batch per model, so inference cost
+    grows with the number of batches rather than one Keras call per symbol.
+    Results are still written per ticker, to predictions:{ticker}:history and :latest.
+    """
+
+    def __init__(self, tickers: List[str], batch_size: int = 256, shard: str = None, clock=None):
+        self.tickers = list(tickers)
+        # defaults to the watchlist itself, so processes with the same tickers compete for one lease
+        self.shard = shard or PREDICTOR_SHARD or ",".join(sorted(self.tickers))
+        self.batch_size = batch_size
+        # drives scheduling, replay pacing, result timestamps and status TTLs (see Pred_models.clock)
+        self.clock = clock or default_clock
+        self.predictors = {ticker: TrendPredict(ticker, clock=self.clock) for ticker in self.tickers}
+        self.config = self.predictors[self.tickers[0]]
+        self.models = None
+        self.backend = None
+        self.scalers = None
+        self.trend_features = None
+        self.states: Dict[str, _TickerState] = {}
+        self.accuracy = AccuracyTracker()
+        self.checkpoints = checkpoint_store if PREDICTOR_CHECKPOINTS else None
+        self.day_frames = {}
+        self.pending = deque()
+        self.scheduler = None
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+
+    def load(self):
+        self.models, self.scalers, self.trend_features = self.config.load_artifacts(warm_up=True)
+        self.backend = self.config.load_backend(self.models, warm_up=True)
+        self.states = {
+            ticker: _TickerState(predictor, self.scalers, self.trend_features)
+            for ticker, predictor in self.predictors.items()
+        }
+
+    def on_candle_close(self, timestamp, candles: Dict[str, dict], closed_at: float = None) -> Dict[str, dict]:
+        """
+        Feeds the candles that just closed (ticker -> OHLCV) and predicts for every
+        ticker whose window is ready, with one forward pass per model. closed_at
+        (epoch seconds the close was observed) is the reference for publish lag.
+        """
+        closed_at = closed_at or self.clock.time()
+        # candles a restored checkpoint already covers were predicted before the restart
+        candles = {ticker: candle for ticker, candle in candles.items() if self.states[ticker].is_new(timestamp)}
+        if not candles:
+            return {}
+        # score the predictions made for these candles before predicting the next ones
+        for ticker, candle in candles.items():
+            self.accuracy.on_candle_close(ticker, timestamp, float(candle["close"]))
+        ready = [ticker for ticker, candle in candles.items() if self.states[ticker].update(timestamp, candle)]
+        if not ready:
+            self._persist({}, candles)
+            return {}
+
+        X_price = np.stack([self.states[ticker].price_matrix.window() for ticker in ready])
+        X_trend = np.stack([self.states[ticker].trend_matrix.window() for ticker in ready])
+        scaled_price_preds, trend_probs = self.backend.predict(X_price, X_trend, batch_size=self.batch_size)
+
+        next_interval_start = timestamp + pd.Timedelta(minutes=5)
+        results = {}
+        for ticker, scaled_price_pred, trend_prob in zip(ready, scaled_price_preds, trend_probs):
+            latest_data = self.states[ticker].last_row
+            current_price = latest_data["close"]
+            result = {
+                "ticker": ticker,
+                "current_price": float(current_price),
+                "predicted_price": float(current_price * (1 + scaled_price_pred / self.config.SCALE_FACTOR)),
+                "trend": "UP" if trend_prob > 0.5 else "DOWN",
+                "confidence": float(trend_prob),
+                "atr": float(latest_data["ATR"]),
+                "ma_short": float(latest_data["MA_short"]),
+                "ma_long": float(latest_data["MA_long"]),
+                "prediction_for": str(next_interval_start.time()),
+                "timestamp": self.clock.now().isoformat(),
+                "simulation_date": str(timestamp.date())
+            }
+            results[ticker] = result
+
+        self._persist(results, candles)
+        for ticker, result in results.items():
+            publish_lag_seconds.observe(self.clock.time() - closed_at, ticker=ticker)
+            self.accuracy.expect(ticker, next_interval_start, result)
+        return results
+
+    def _persist(self, results: Dict[str, dict], tickers):
+        """
+        The candle's predictions and the checkpoint of every ticker that consumed
+        it, in one MULTI: after a crash a candle is either entirely done or not
+        done at all, so resuming never rewrites a prediction.
+        """
+        pipe = redis_client.pipeline(transaction=True)
+        for ticker, result in results.items():
+            prediction_store.save(ticker, result, client=pipe)
+        if self.checkpoints is not None:
+            self.checkpoints.save({ticker: self._checkpoint(ticker) for ticker in tickers}, client=pipe)
+        # one round trip for the whole batch, so it is timed once rather than per ticker
+        with stage_seconds.time(stage="persist", ticker="*"):
+            pipe.execute()
+        for ticker, result in results.items():
+            print(f"✅ Saved prediction for {prediction_field(result)} -> {ticker}")
+
+    def _checkpoint(self, ticker: str) -> dict:
+        # rolling accuracy rides along, so a restart doesn't reset the live accuracy view
+        return {**self.states[ticker].get_state(), "accuracy": self.accuracy.get_state(ticker)}
+
+    def _resume(self, ticker: str, checkpoint: dict, target_day: pd.Timestamp) -> bool:
+        """Restores a ticker's state from its checkpoint if it can continue into target_day."""
+        if not checkpoint:
+            return False
+        state = self.states[ticker]
+        last = checkpoint["features"]["last_timestamp"]
+        if not state.compatible(checkpoint) or last is None or pd.Timestamp(last).date() > target_day.date():
+            print(f"[Checkpoint] {ticker}: checkpoint doesn't apply to {target_day.date()}; warming up from history")
+            return False
+        state.set_state(checkpoint)
+        return True
+
+    def prepare(self, queue_replay: bool = True) -> bool:
+        """
+        Loads models and warms every ticker's state on the history before
+        TARGET_DAY. With queue_replay, that day's candles are queued for replay,
+        one per scheduler tick; otherwise candles come from a bar source.
+        """
+        print(f"--- Initializing Predictor Service for {len(self.tickers)} tickers ---")
+        try:
+            self.load()
+        except Exception as e:
+            print(f"[Initialization Error] Could not load models/scalers: {e}")
+            return False
+
+        target_day = pd.Timestamp(self.config.TARGET_DAY).normalize()
+        try:
+            checkpoints = self.checkpoints.load(self.tickers) if self.checkpoints is not None else {}
+        except Exception as e:
+            print(f"[Checkpoint] Could not read checkpoints: {e}")
+            checkpoints = {}
+
+        self.day_frames = {}
+        for ticker, predictor in self.predictors.items():
+            state = self.states[ticker]
+            if ticker in checkpoints:
+                # scoring history carries over even when the features have to be warmed up again
+                self.accuracy.set_state(ticker, checkpoints[ticker].get("accuracy"))
+            try:
+                if queue_replay:
+                    day = predictor.load_history(target_day, target_day + pd.Timedelta(days=1))
+                    if day.empty:
+                        print(f"[Data Error] {ticker}: no data available for {self.config.TARGET_DAY}")
+                        continue
+                    self.day_frames[ticker] = day
+                if self._resume(ticker, checkpoints.get(ticker), target_day):
+                    # usually nothing to feed: only candles between the checkpoint and the target day
+                    state.catch_up(predictor.load_history(state.last_timestamp, target_day))
+                    print(f"[Checkpoint] {ticker}: resumed after {state.last_timestamp}")
+                else:
+                    state.warm_up(predictor.load_history(end=target_day))
+            except Exception as e:
+                print(f"[Data Prep Error] {ticker}: {e}")
+                self.day_frames.pop(ticker, None)
+                continue
+
+        if not queue_replay:
+            return True
+        if not self.day_frames:
+            print("[Data Error] No ticker has data for the target day")
+            return False
+
+        timestamps = sorted(set().union(*(day.index for day in self.day_frames.values())))
+        self.pending = deque(ts for ts in timestamps if any(self.states[t].is_new(ts) for t in self.day_frames))
+        if len(self.pending) < len(timestamps):
+            print(f"[Checkpoint] Skipping {len(timestamps) - len(self.pending)} already processed candles")
+        print(f"\n--- ✅ Service is LIVE for {list(self.day_frames)}. Simulating trading day for {self.config.TARGET_DAY} ---")
+        return True
+
+    def _predict_closed(self, timestamp, candles: Dict[str, dict], closed_at: float = None):
+        try:
+            results = self.on_candle_close(timestamp, candles, closed_at)
+            latency = f" {(self.clock.time() - closed_at) * 1000:.1f} ms after the close" if closed_at else ""
+            print(f"[{timestamp.time()}] Predicted {len(results)}/{len(candles)} tickers{latency}")
+        except Exception as e:
+            print(f"[{timestamp.time()}] Prediction error: {e}")
+        self.publish_status(timestamp)
+
+    def step(self, candle_close=None) -> bool:
+        """Processes the next queued candle; False once the day is done."""
+        if not self.pending:
+            return False
+        current_timestamp = self.pending.popleft()
+        candles = {
+            ticker: day.loc[current_timestamp]
+            for ticker, day in self.day_frames.items() if current_timestamp in day.index
+        }
+        self._predict_closed(current_timestamp, candles, candle_close.timestamp() if candle_close else None)
+        if not self.pending:
+            print("\n--- Simulation for the day complete. Service finished. ---")
+            return False
+        return True
+
+    def memory_report(self) -> Dict[str, dict]:
+        """Resident bytes of each ticker's window buffers and queued day, and per candle held."""
+        report = {}
+        for ticker, state in self.states.items():
+            day = self.day_frames.get(ticker)
+            nbytes = state.nbytes() + (int(day.memory_usage(index=True).sum()) if day is not None else 0)
+            candles = len(state.price_matrix) + (len(day) if day is not None else 0)
+            report[ticker] = {"bytes": nbytes, "candles": candles,
+                              "bytes_per_candle": round(nbytes / candles, 1) if candles else None}
+        return report
+
+    def publish_status(self, last_candle=None):
+        """Heartbeat for the API (which may run in another process): predictor:status:{worker_id}."""
+        status = {
+            "worker_id": self.worker_id,
+            "shard": self.shard,
+            "tickers": list(self.day_frames) or self.tickers,
+            "last_candle": str(last_candle) if last_candle is not None else None,
+            "pending_candles": len(self.pending),
+            "scheduler": self.scheduler.stats() if self.scheduler else None,
+            "memory": self.memory_report(),
+            "clock": self.clock.name,
+            "updated_at": self.clock.now().isoformat(),
+        }
+        try:
+            ttl = self.clock.ttl(900)
+            redis_client.set(f"predictor:status:{self.worker_id}", json.dumps(status), ex=ttl)
+            metrics.publish(redis_client, ttl)
+        except Exception as e:
+            print(f"[PredictorService] Could not publish status: {e}")
+
+    async def run_scheduled(self, interval_seconds: int = 300, settle_seconds: float = 2.0, missed: str = "skip"):
+        """
+        Prepares in a worker thread, then predicts at every candle close on the
+        running event loop. Cancel the task to stop it. Returns False if it
+        could not start, True once the day is done.
+        """
+        if not await asyncio.get_running_loop().run_in_executor(None, self.prepare):
+            return False
+        self.scheduler = CandleScheduler(self.step, interval_seconds, settle_seconds, missed=missed,
+                                         name="PredictorService", clock=self.clock)
+        await self.scheduler.run()
+        return True
+
+    def _read_candles(self, bars_source, aggregator: CandleAggregator, pyramids: dict):
+        """
+        Reads the next batch of minute bars and folds it into the 5-minute
+        candles and the chart pyramids (blocking: the read waits for bars and
+        every pyramid write is file I/O). Returns (exhausted, closed candles).
+        """
+        bars = bars_source.read(1.0)
+        if bars is None:
+            return True, aggregator.flush()
+        closed = [c for ticker, ts, bar in bars if ticker in self.states
+                  for c in aggregator.add(ticker, ts, bar)]
+        for ticker, pyramid in pyramids.items():
+            ticker_bars = [(ts, bar) for t, ts, bar in bars if t == ticker]
+            if ticker_bars:
+                pyramid.add_bars(ticker_bars)
+        if bars:
+            closed += aggregator.close_due(max(ts for _, ts, _ in bars))
+        return False, closed
+
+    async def run_streaming(self, source: str = "replay", seconds_per_bar: float = None):
+        """
+        Predicts from minute bars (source: replay | csv | redis, see
+        Pred_models.ingestion). Bars are folded into 5-minute candles and each
+        candle is predicted as soon as its last minute arrives, with tickers
+        that close together batched into one forward pass. Returns False if it
+        could not start, True once the source is exhausted.
+        """
+        loop = asyncio.get_running_loop()
+        if not await loop.run_in_executor(None, self.prepare, False):
+            return False
+        data_files = {ticker: predictor.DATA_FILE for ticker, predictor in self.predictors.items()}
+        bars_source = await loop.run_in_executor(
+            None, make_source, source, data_files, self.config.TARGET_DAY, seconds_per_bar, self.clock
+        )
+        aggregator = CandleAggregator()
+        # keep the chart candles (1m..1d) current from the same bars
+        pyramids = {}
+        for ticker, data_file in data_files.items():
+            try:
+                pyramids[ticker] = await loop.run_in_executor(None, get_pyramid, ticker, data_file)
+            except Exception as e:
+                print(f"[CandlePyramid] {ticker}: not maintained ({e})")
+        print(f"\n--- ✅ Service is LIVE for {self.tickers}, streaming minute bars from '{source}' ---")
+
+        while True:
+            exhausted, closed = await loop.run_in_executor(None, self._read_candles, bars_source, aggregator, pyramids)
+            received_at = self.clock.time()
+
+            by_close = {}
+            for ticker, ts, candle in closed:
+                by_close.setdefault(ts, {})[ticker] = candle
+            for ts in sorted(by_close):
+                await loop.run_in_executor(None, self._predict_closed, ts, by_close[ts], received_at)
+            if exhausted:
+                print("\n--- Bar source exhausted. Service finished. ---")
+                return True
+
+    async def run_as_leader(self, interval_seconds: int = 300, settle_seconds: float = 2.0, missed: str = "skip",
+                            lease_seconds: float = PREDICTOR_LEASE_SECONDS, source: str = None):
+        """
+        run_scheduled (or run_streaming when a bar source is given), but only in
+        the one process holding predictor:leader:{shard}. Standbys don't load
+        models; one of them takes over within about lease_seconds * 4/3 if the
+        leader dies. Once the leader has finished TARGET_DAY the shard is marked
+        done for it (predictor:done:{shard}:{day}) and standbys exit instead of
+        running the day again.
+        """
+        def start():
+            if source:
+                return self.run_streaming(source, PREDICTOR_REPLAY_SECONDS_PER_BAR)
+            return self.run_scheduled(interval_seconds, settle_seconds, missed)
+
+        lease = RedisLease(f"predictor:leader:{self.shard}", self.worker_id, lease_seconds)
+        await run_while_leader(lease, start, name="PredictorService",
+                               done_key=f"predictor:done:{self.shard}:{self.config.TARGET_DAY}")
+
+    def run_continuously(self, interval_seconds: int = 300, settle_seconds: float = 2.0, missed: str = "skip",
+                         source: str = None):
+        """Blocking, multi-ticker counterpart of TrendPredict.run_continuously."""
+        asyncio.run(self.run_as_leader(interval_seconds, settle_seconds, missed, source=source))
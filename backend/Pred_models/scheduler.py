@@ -0,0 +1,127 @@
+import asyncio
+from collections import deque
+from datetime import datetime, timezone
+
+from Pred_models.clock import clock as default_clock
+
+
+class CandleScheduler:
+    """
+    Calls `callback(candle_close)` at every candle close (multiples of
+    interval_seconds since the epoch: :00, :05, ... for 5-minute candles) plus
+    settle_seconds, so late ticks from the data feed are in before we predict.
+
+    The next fire time is always derived from the clock, never from "sleep
+    after work", so inference time doesn't accumulate as drift. If a tick runs
+    past the next close, the missed closes are either skipped (missed="skip")
+    or run back to back (missed="catch_up", at most max_catch_up of them; the
+    rest are skipped). The callback is blocking and runs in the default
+    executor; returning False stops the scheduler. All times, sleeps included,
+    come from `clock` (Pred_models.clock), so a scaled or fast clock replays
+    candles at an accelerated cadence.
+    """
+
+    def __init__(self, callback, interval_seconds: int = 300, settle_seconds: float = 2.0,
+                 missed: str = "skip", max_catch_up: int = 3, deadline_seconds: float = None,
+                 name: str = "predictor", clock=None):
+        if missed not in ("skip", "catch_up"):
+            raise ValueError(f"missed must be 'skip' or 'catch_up', not '{missed}'")
+        self.callback = callback
+        self.interval = interval_seconds
+        self.settle = settle_seconds
+        self.missed = missed
+        self.max_catch_up = max_catch_up
+        # a tick counts as late if its result lands more than this after the candle closed
+        self.deadline = deadline_seconds if deadline_seconds is not None else settle_seconds + interval_seconds / 5
+        self.name = name
+        self.clock = clock or default_clock
+        self._task = None
+        self._ticks = deque(maxlen=288)  # one trading day of 5-minute ticks
+        self._counts = {"ticks": 0, "skipped": 0, "caught_up": 0, "late": 0, "errors": 0}
+
+    def next_close(self, now: float) -> float:
+        return (now // self.interval + 1) * self.interval
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        close = self.next_close(self.clock.time())
+        print(f"[{self.name}] Scheduler started: every {self.interval}s + {self.settle}s settle, "
+              f"missed={self.missed}, clock={self.clock.name}")
+        try:
+            while True:
+                await self.clock.sleep_async(close + self.settle - self.clock.time())
+                if await self._tick(loop, close) is False:
+                    break
+
+                # closes that passed while we were busy
+                missed = []
+                next_close = close + self.interval
+                while next_close + self.settle <= self.clock.time():
+                    missed.append(next_close)
+                    next_close += self.interval
+                if missed:
+                    replay = missed[:self.max_catch_up] if self.missed == "catch_up" else []
+                    self._counts["skipped"] += len(missed) - len(replay)
+                    print(f"[{self.name}] Fell behind by {len(missed)} candle(s); "
+                          f"catching up {len(replay)}, skipping {len(missed) - len(replay)}")
+                    stop = False
+                    for missed_close in replay:
+                        self._counts["caught_up"] += 1
+                        if await self._tick(loop, missed_close) is False:
+                            stop = True
+                            break
+                    if stop:
+                        break
+                    next_close = self.next_close(self.clock.time() - self.settle)
+                close = next_close
+        except asyncio.CancelledError:
+            print(f"[{self.name}] Scheduler cancelled")
+            raise
+        print(f"[{self.name}] Scheduler finished")
+
+    async def _tick(self, loop, close: float):
+        candle_close = datetime.fromtimestamp(close, tz=timezone.utc)
+        fired = self.clock.time()
+        try:
+            keep_going = await loop.run_in_executor(None, self.callback, candle_close)
+        except Exception as e:
+            self._counts["errors"] += 1
+            print(f"[{self.name}] Tick {candle_close.isoformat()} failed: {e}")
+            keep_going = None
+        done = self.clock.time()
+
+        record = {
+            "candle_close": candle_close.isoformat(),
+            "fire_lag_seconds": round(fired - close - self.settle, 4),
+            "compute_seconds": round(done - fired, 4),
+            "publish_delay_seconds": round(done - close, 4),
+        }
+        self._ticks.append(record)
+        self._counts["ticks"] += 1
+        if record["publish_delay_seconds"] > self.deadline:
+            self._counts["late"] += 1
+            print(f"[{self.name}] Late tick {record}")
+        return keep_going
+
+    def start(self) -> asyncio.Task:
+        """Runs the scheduler as a task on the current event loop."""
+        self._task = asyncio.get_running_loop().create_task(self.run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self) -> dict:
+        delays = [t["publish_delay_seconds"] for t in self._ticks]
+        return {
+            **self._counts,
+            "deadline_seconds": round(self.deadline, 3),
+            "publish_delay_mean_seconds": round(sum(delays) / len(delays), 4) if delays else None,
+            "publish_delay_max_seconds": max(delays) if delays else None,
+            "last_tick": self._ticks[-1] if self._ticks else None,
+        }
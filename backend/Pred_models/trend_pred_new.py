@@ -266,28 +266,39 @@
 import pandas as pd
 import numpy as np
 import os
-import tensorflow as tf
-import pickle
 import time
-from tensorflow.keras.models import load_model
 import warnings
 
-import json
-from database.redisClient import redis_client
-from datetime import datetime
+from database.predictionStore import prediction_store, prediction_field
+
+from Pred_models.indicators import StreamingFeatures, FEATURE_COLUMNS, FEATURE_DTYPE
+from Pred_models.feature_matrix import FeatureMatrix
+from Pred_models.data_cache import load_5min_bars
+from Pred_models.model_registry import registry
+from Pred_models.metrics import stage_seconds
+from Pred_models.clock import clock as default_clock
+from Pred_models.inference import KerasPredictBackend, KERAS_BACKENDS, create_backend, measure_latency
 
 warnings.filterwarnings("ignore")
 
-DATA_FILE = 'Pred_models/TATAMOTORS_minute.csv'
+DATA_FILE_PATTERN = 'Pred_models/{ticker}_minute.csv'
+DATA_FILE = DATA_FILE_PATTERN.format(ticker="TATAMOTORS")
+# Featured columns saved with every prediction (as atr, ma_short, ma_long) for the SignalAgent's regimes
+SIGNAL_COLUMNS = ["ATR", "MA_short", "MA_long"]
 
 
 class TrendPredict:
-    def __init__(self):
+    def __init__(self, ticker: str = "TATAMOTORS", data_file: str = None, clock=None):
+        self.TICKER = ticker
+        self.DATA_FILE = data_file or DATA_FILE_PATTERN.format(ticker=ticker)
+        # sleeps between candles and result timestamps (real, scaled or fast; see Pred_models.clock)
+        self.clock = clock or default_clock
         self.PRICE_LSTM_MODEL_PATH = 'Pred_models/lstm_feature_extractor_5min.h5'
         self.PRICE_SCALER_PATH = 'Pred_models/scaler_5min.pkl'
         self.TREND_MODEL_PATH = 'Pred_models/directional_model.h5'
         self.TREND_SCALER_PATH = 'Pred_models/scalers.pkl'
 
+        self.INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "compiled")
         self.TARGET_DAY = '2025-07-21'
         self.TIME_STEPS = 60
         self.SCALE_FACTOR = 1000
@@ -296,103 +307,141 @@ class TrendPredict:
                                "RSI", "ATR", "ADX"]
 
     def save_prediction(self, ticker: str, result: dict):
-        redis_key = f"predictions:{ticker}"
-        # unique field: simulation_date + prediction_for
-        field_key = f"{result['simulation_date']} {result['prediction_for']}"
-
-        # write to hash
-        redis_client.hset(redis_key, field_key, json.dumps(result))
-
-        # update :latest only if this simulated datetime is newer than stored one
-        latest_key = f"{redis_key}:latest"
-        try:
-            existing = redis_client.get(latest_key)
-            if existing:
-                existing_obj = json.loads(existing)
-                # combine simulation_date + prediction_for to form comparable datetime
-                existing_dt = datetime.strptime(
-                    f"{existing_obj['simulation_date']} {existing_obj['prediction_for']}",
-                    "%Y-%m-%d %H:%M:%S"
-                )
-            else:
-                existing_dt = None
+        # history write and monotonic :latest update in one atomic call
+        with stage_seconds.time(stage="persist", ticker=ticker):
+            prediction_store.save(ticker, result)
+        print(f"✅ Saved prediction for {prediction_field(result)} -> {ticker}")
+
+    def save_predictions(self, ticker: str, results: list):
+        """Bulk version of save_prediction: the whole batch in one pipelined round trip."""
+        if not results:
+            return
+        with stage_seconds.time(stage="persist", ticker=ticker):
+            prediction_store.save_many(ticker, results)
+        print(f"✅ Saved {len(results)} predictions -> {ticker}")
 
-            new_dt = datetime.strptime(f"{result['simulation_date']} {result['prediction_for']}", "%Y-%m-%d %H:%M:%S")
+    def load_history(self, start=None, end=None) -> pd.DataFrame:
+        """5-minute candles of DATA_FILE in [start, end) (from the columnar cache)."""
+        with stage_seconds.time(stage="data_load", ticker=self.TICKER):
+            return load_5min_bars(self.DATA_FILE, start, end)
 
-            if existing_dt is None or new_dt >= existing_dt:
-                redis_client.set(latest_key, json.dumps(result))
+    def featured_history(self, full_df_5min: pd.DataFrame) -> pd.DataFrame:
+        with stage_seconds.time(stage="add_features", ticker=self.TICKER):
+            return self.add_features(full_df_5min)
 
-        except Exception as e:
-            # fallback: set latest (safe option) and log the error
-            print(f"[save_prediction] Error checking latest key: {e}. Overwriting latest.")
-            redis_client.set(latest_key, json.dumps(result))
+    def load_artifacts(self, warm_up: bool = False):
+        """
+        Models and scalers from the process-wide registry (loaded once, shared by
+        every caller); returns (models, scalers, trend_features). The Keras models
+        are only loaded for the Keras-based backends; TFLite needs just the scalers.
+        """
+        models = {}
+        if self.INFERENCE_BACKEND in KERAS_BACKENDS:
+            if warm_up:
+                registry.warm_up(self.PRICE_LSTM_MODEL_PATH, compile=False)
+                registry.warm_up(self.TREND_MODEL_PATH)
+            models = {
+                'price_lstm': registry.get_model(self.PRICE_LSTM_MODEL_PATH, compile=False),
+                'trend': registry.get_model(self.TREND_MODEL_PATH)
+            }
+        price_scaler = registry.get_pickle(self.PRICE_SCALER_PATH)
+        trend_data = registry.get_pickle(self.TREND_SCALER_PATH)
+        scalers = {'price': price_scaler, 'trend': trend_data['scaler_X']}
+        return models, scalers, trend_data['features']
 
-        print(f"✅ Saved prediction for {field_key} -> {ticker}")
+    def load_backend(self, models, warm_up: bool = False):
+        """
+        Shared inference backend (INFERENCE_BACKEND: 'compiled' by default, 'keras',
+        'tflite' or 'tflite_quant') for the registry models. With warm_up, traces it
+        once and reports its per-candle latency next to plain model.predict().
+        """
+        key = f"{self.INFERENCE_BACKEND}:{self.PRICE_LSTM_MODEL_PATH}+{self.TREND_MODEL_PATH}"
+        backend = registry.get_backend(key, lambda: create_backend(
+            self.INFERENCE_BACKEND, models, self.PRICE_LSTM_MODEL_PATH, self.TREND_MODEL_PATH
+        ))
+        if warm_up:
+            X_price = np.zeros((1,) + backend.input_shapes[0], dtype=np.float32)
+            X_trend = np.zeros((1,) + backend.input_shapes[1], dtype=np.float32)
+            candidates = {backend.name: backend}
+            if models:
+                candidates["keras"] = KerasPredictBackend(models)
+            for candidate in candidates.values():
+                registry.record_latency(candidate.name, measure_latency(candidate, X_price, X_trend))
+            print(f"[Inference] ms per candle: {registry.stats()['inference_ms_per_candle']}")
+        return backend
 
     def add_features(self, df):
-        df_feat = df.copy()
-        df_feat["EMA_10"] = df_feat["close"].ewm(span=10, adjust=False).mean()
-        df_feat["EMA_30"] = df_feat["close"].ewm(span=30, adjust=False).mean()
-        rolling_mean = df_feat["close"].rolling(window=20).mean()
-        rolling_std = df_feat["close"].rolling(window=20).std()
-        df_feat["Boll_Upper"] = rolling_mean + (rolling_std * 2)
-        df_feat["Boll_Lower"] = rolling_mean - (rolling_std * 2)
-        delta = df_feat["close"].diff()
+        """
+        Indicator features of a 5-minute OHLCV frame, warm-up rows dropped.
+        Indicators are computed in float64 but stored once, as float32 columns
+        of a single block (FEATURE_COLUMNS order); `df` is not copied.
+        """
+        close, high, low = df["close"], df["high"], df["low"]
+        feat = {name: df[name] for name in ("open", "high", "low", "close", "volume")}
+        feat["EMA_10"] = close.ewm(span=10, adjust=False).mean()
+        feat["EMA_30"] = close.ewm(span=30, adjust=False).mean()
+        rolling_mean = close.rolling(window=20).mean()
+        rolling_std = close.rolling(window=20).std()
+        feat["Boll_Upper"] = rolling_mean + (rolling_std * 2)
+        feat["Boll_Lower"] = rolling_mean - (rolling_std * 2)
+        delta = close.diff()
         gain = delta.where(delta > 0, 0)
         loss = -delta.where(delta < 0, 0)
         rs = gain.rolling(14).mean() / (loss.rolling(14).mean() + 1e-9)
-        df_feat["RSI"] = 100 - (100 / (1 + rs))
-        high_low = df_feat["high"] - df_feat["low"]
-        high_close = (df_feat["high"] - df_feat["close"].shift(1)).abs()
-        low_close = (df_feat["low"] - df_feat["close"].shift(1)).abs()
+        feat["RSI"] = 100 - (100 / (1 + rs))
+        high_low = high - low
+        high_close = (high - close.shift(1)).abs()
+        low_close = (low - close.shift(1)).abs()
         tr = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
-        df_feat["ATR"] = tr.rolling(14).mean()
-        plus_dm = df_feat["high"].diff(); plus_dm[plus_dm < 0] = 0
-        minus_dm = -df_feat["low"].diff(); minus_dm[minus_dm < 0] = 0
+        feat["ATR"] = tr.rolling(14).mean()
+        plus_dm = high.diff(); plus_dm[plus_dm < 0] = 0
+        minus_dm = -low.diff(); minus_dm[minus_dm < 0] = 0
         tr14 = tr.rolling(14).sum()
         plus_di = 100 * (plus_dm.ewm(alpha=1/14).mean() / (tr14 + 1e-9))
         minus_di = 100 * (minus_dm.ewm(alpha=1/14).mean() / (tr14 + 1e-9))
         dx = 100 * (plus_di - minus_di).abs() / (plus_di + minus_di + 1e-9)
-        df_feat["ADX"] = dx.ewm(alpha=1/14).mean()
-
-        ema_12 = df_feat['close'].ewm(span=12, adjust=False).mean()
-        ema_26 = df_feat['close'].ewm(span=26, adjust=False).mean()
-        df_feat['MACD'] = ema_12 - ema_26
-        df_feat['MACD_Signal'] = df_feat['MACD'].ewm(span=9, adjust=False).mean()
-        df_feat['volatility'] = df_feat['close'].pct_change().rolling(window=20).std()
-        df_feat['RSI_change'] = df_feat['RSI'].diff(5)
-        df_feat['hour_of_day'] = df_feat.index.hour
-        df_feat['day_of_week'] = df_feat.index.dayofweek
+        feat["ADX"] = dx.ewm(alpha=1/14).mean()
+
+        ema_12 = close.ewm(span=12, adjust=False).mean()
+        ema_26 = close.ewm(span=26, adjust=False).mean()
+        feat['MACD'] = ema_12 - ema_26
+        feat['MACD_Signal'] = feat['MACD'].ewm(span=9, adjust=False).mean()
+        feat['volatility'] = close.pct_change().rolling(window=20).std()
+        feat['RSI_change'] = feat['RSI'].diff(5)
+        feat['hour_of_day'] = df.index.hour
+        feat['day_of_week'] = df.index.dayofweek
                 # MODIFICATION: Add short and long-term Simple Moving Averages
-        df_feat["MA_short"] = df_feat["close"].rolling(window=10).mean()
-        df_feat["MA_long"] = df_feat["close"].rolling(window=50).mean()
-        return df_feat.dropna()
+        feat["MA_short"] = close.rolling(window=10).mean()
+        feat["MA_long"] = close.rolling(window=50).mean()
+
+        # dropna() without materializing the full-length frame first
+        warm = np.ones(len(df), dtype=bool)
+        for column in feat.values():
+            warm &= ~np.isnan(np.asarray(column, dtype=np.float64))
+        values = np.empty((int(warm.sum()), len(FEATURE_COLUMNS)), dtype=FEATURE_DTYPE)
+        for i, name in enumerate(FEATURE_COLUMNS):
+            values[:, i] = np.asarray(feat[name])[warm]
+        return pd.DataFrame(values, index=df.index[warm], columns=FEATURE_COLUMNS)
 
     def get_combined_prediction(self, window_df, models, scalers, trend_features):
-        PRICE_FEATURES = self.PRICE_FEATURES
-        TIME_STEPS = self.TIME_STEPS
-        SCALE_FACTOR = self.SCALE_FACTOR
+        price_window = scalers['price'].transform(window_df[self.PRICE_FEATURES])
+        trend_window = scalers['trend'].transform(window_df[trend_features])
+        return self.predict_window(KerasPredictBackend(models), price_window, trend_window,
+                                   window_df['close'].iloc[-1])
 
-        price_lstm_model = models['price_lstm']
-        price_scaler = scalers['price']
-
-        price_features_unscaled = window_df[PRICE_FEATURES]
-        price_features_scaled = price_scaler.transform(price_features_unscaled)
-        X_pred_lstm = np.reshape(price_features_scaled, (1, TIME_STEPS, len(PRICE_FEATURES)))
-
-        scaled_price_pred = price_lstm_model.predict(X_pred_lstm, verbose=0)[0][0]
+    def predict_window(self, backend, price_window, trend_window, last_close_price):
+        """
+        Runs both models on one already-scaled window each, e.g. the views
+        handed out by FeatureMatrix.window(); nothing is rescaled or copied here.
+        """
+        X_pred_lstm = np.reshape(price_window, (1, self.TIME_STEPS, len(self.PRICE_FEATURES)))
+        X_pred_trend = np.expand_dims(trend_window, axis=0)
+        scaled_price_preds, trend_probs = backend.predict(X_pred_lstm, X_pred_trend)
 
-        predicted_return = scaled_price_pred / SCALE_FACTOR
-        last_close_price = price_features_unscaled['close'].iloc[-1]
+        predicted_return = scaled_price_preds[0] / self.SCALE_FACTOR
         predicted_price = last_close_price * (1 + predicted_return)
 
-        trend_model = models['trend']
-        trend_scaler = scalers['trend']
-        trend_features_unscaled = window_df[trend_features]
-        trend_features_scaled = trend_scaler.transform(trend_features_unscaled)
-        X_pred_trend = np.expand_dims(trend_features_scaled, axis=0)
-
-        trend_prob = float(trend_model.predict(X_pred_trend, verbose=0)[0][0])
+        trend_prob = float(trend_probs[0])
         trend_direction = "UP" if trend_prob > 0.5 else "DOWN"
 
         return float(predicted_price), trend_direction, trend_prob
@@ -407,71 +456,78 @@ class TrendPredict:
 
         # --- This block is identical to the setup in run_simulation ---
         try:
-            models = {
-                'price_lstm': load_model(self.PRICE_LSTM_MODEL_PATH, compile=False),
-                'trend': load_model(self.TREND_MODEL_PATH)
-            }
-            with open(self.PRICE_SCALER_PATH, 'rb') as f:
-                price_scaler = pickle.load(f)
-            with open(self.TREND_SCALER_PATH, 'rb') as f:
-                trend_data = pickle.load(f)
-                trend_scaler = trend_data['scaler_X']
-                trend_features = trend_data['features']
-            scalers = {'price': price_scaler, 'trend': trend_scaler}
+            models, scalers, trend_features = self.load_artifacts(warm_up=True)
+            backend = self.load_backend(models, warm_up=True)
+            price_scaler, trend_scaler = scalers['price'], scalers['trend']
         except Exception as e:
             print(f"[Initialization Error] Could not load models/scalers: {e}")
             return
 
         try:
-            full_df_1min = pd.read_csv(DATA_FILE, parse_dates=["date"], index_col="date")
-            full_df_5min = full_df_1min.resample('5T').agg({
-                'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'
-            }).dropna()
-            df_featured_full = self.add_features(full_df_5min)
+            full_df_5min = self.load_history()
         except Exception as e:
             print(f"[Data Prep Error] Could not prepare data: {e}")
             return
 
-        simulation_day = df_featured_full[df_featured_full.index.date == pd.to_datetime(self.TARGET_DAY).date()]
+        simulation_day = full_df_5min[full_df_5min.index.date == pd.to_datetime(self.TARGET_DAY).date()]
         if simulation_day.empty:
             print(f"[Data Error] No data available for {self.TARGET_DAY}")
             return
+
+        # Warm the streaming indicators on the history before the target day once;
+        # every candle after that is a constant-time update instead of a full add_features pass.
+        feature_engine = StreamingFeatures()
+        max_rows = 4 * self.TIME_STEPS
+        with stage_seconds.time(stage="add_features", ticker=self.TICKER):
+            warm_rows = feature_engine.update_frame(full_df_5min[full_df_5min.index < simulation_day.index[0]],
+                                                    last=max_rows)
+        # Scaled once per row: history here, then only the newly appended row per candle
+        with stage_seconds.time(stage="scaling", ticker=self.TICKER):
+            price_matrix = FeatureMatrix.from_frame(warm_rows, self.PRICE_FEATURES, price_scaler,
+                                                    self.TIME_STEPS, max_rows=max_rows)
+            trend_matrix = FeatureMatrix.from_frame(warm_rows, trend_features, trend_scaler,
+                                                    self.TIME_STEPS, max_rows=max_rows)
+        # only the day's candles and the bounded buffers live on for the rest of the loop
+        del full_df_5min, warm_rows
         # --- End of setup block ---
 
         print(f"\n--- ✅ Service is LIVE. Simulating trading day for {self.TARGET_DAY} ---")
         
         # This is the main service loop
-        for current_timestamp in simulation_day.index:
-            print(f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Processing timestamp: {current_timestamp.time()}")
-            
-            end_idx_loc = df_featured_full.index.get_loc(current_timestamp)
-            start_idx_loc = end_idx_loc - self.TIME_STEPS + 1
+        for current_timestamp, candle in simulation_day.iterrows():
+            print(f"\n[{self.clock.now().strftime('%Y-%m-%d %H:%M:%S')}] Processing timestamp: {current_timestamp.time()}")
+
+            row = feature_engine.update(
+                current_timestamp, float(candle["open"]), float(candle["high"]),
+                float(candle["low"]), float(candle["close"]), float(candle["volume"])
+            )
             
             # Skip if there's not enough historical data
-            if start_idx_loc < 0:
+            if row is None:
                 print(f"[{current_timestamp.time()}] Not enough history yet; skipping.")
-                time.sleep(sleep_seconds)
+                self.clock.sleep(sleep_seconds)
                 continue
 
-            historical_window = df_featured_full.iloc[start_idx_loc: end_idx_loc + 1]
-            if len(historical_window) < self.TIME_STEPS:
+            price_matrix.append(row)
+            trend_matrix.append(row)
+            if len(price_matrix) < self.TIME_STEPS:
                 print(f"[{current_timestamp.time()}] Historical window too short; skipping.")
-                time.sleep(sleep_seconds)
+                self.clock.sleep(sleep_seconds)
                 continue
 
             # Make and save the prediction
             try:
-                price, trend_dir, trend_conf = self.get_combined_prediction(
-                    historical_window, models, scalers, trend_features
+                price, trend_dir, trend_conf = self.predict_window(
+                    backend, price_matrix.window(), trend_matrix.window(), row['close']
                 )
                 # Get the most recent row of data to extract features from
-                latest_data = historical_window.iloc[-1]
+                latest_data = row
                 
-                current_price = historical_window.iloc[-1]['close']
+                current_price = row['close']
                 next_interval_start = current_timestamp + pd.Timedelta(minutes=5)
 
                 result = {
-                    "ticker": "TATAMOTORS",
+                    "ticker": self.TICKER,
                     "current_price": float(current_price),
                     "predicted_price": float(price),
                     "trend": trend_dir,
@@ -482,18 +538,18 @@ class TrendPredict:
                     "ma_long": float(latest_data["MA_long"]),
 
                     "prediction_for": str(next_interval_start.time()),
-                    "timestamp": datetime.utcnow().isoformat(),
+                    "timestamp": self.clock.now().isoformat(),
                     "simulation_date": str(current_timestamp.date())
 
                 }
-                self.save_prediction("TATAMOTORS", result)
+                self.save_prediction(self.TICKER, result)
                 
             except Exception as e:
                 print(f"[{current_timestamp.time()}] Prediction error: {e}")
 
             # Wait for the next interval
             print(f"🎉🎉--- Prediction saved. Waiting for {sleep_seconds} seconds... ---")
-            time.sleep(sleep_seconds)
+            self.clock.sleep(sleep_seconds)
             
         print("\n--- Simulation for the day complete. Service finished. ---")
 
@@ -502,132 +558,205 @@ class TrendPredict:
     def run_simulation(self, sleep_seconds: int = 300, save_placeholders: bool = True):
         """
         Run simulation loop.
-        - sleep_seconds: how long to wait between iterations (set 0 for fast backtest)
+        - sleep_seconds: how long to wait between iterations (use run_backtest for a fast batched replay)
         - save_placeholders: save entries with predicted_price=None when not enough history
         """
         print("--- Starting Combined 5-Minute Live Prediction Simulation ---")
 
         # load models & scalers
         try:
-            models = {
-                'price_lstm': load_model(self.PRICE_LSTM_MODEL_PATH, compile=False),
-                'trend': load_model(self.TREND_MODEL_PATH)
-            }
-            with open(self.PRICE_SCALER_PATH, 'rb') as f:
-                price_scaler = pickle.load(f)
-            with open(self.TREND_SCALER_PATH, 'rb') as f:
-                trend_data = pickle.load(f)
-                trend_scaler = trend_data['scaler_X']
-                trend_features = trend_data['features']
-            scalers = {'price': price_scaler, 'trend': trend_scaler}
+            models, scalers, trend_features = self.load_artifacts()
+            backend = self.load_backend(models)
+            price_scaler, trend_scaler = scalers['price'], scalers['trend']
         except Exception as e:
             print(f"[run_simulation] Error loading models/scalers: {e}")
             return
 
         # prepare data
         try:
-            full_df_1min = pd.read_csv(DATA_FILE, parse_dates=["date"], index_col="date")
-            full_df_5min = full_df_1min.resample('5T').agg({
-                'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'
-            }).dropna()
-            df_featured_full = self.add_features(full_df_5min)
+            full_df_5min = self.load_history()
+            df_featured_full = self.featured_history(full_df_5min)
         except Exception as e:
             print(f"[run_simulation] Error preparing data: {e}")
             return
 
         # filter day
-        simulation_day = df_featured_full[df_featured_full.index.date == pd.to_datetime(self.TARGET_DAY).date()]
-        if simulation_day.empty:
+        day_positions = np.flatnonzero(df_featured_full.index.date == pd.to_datetime(self.TARGET_DAY).date())
+        if len(day_positions) == 0:
             print(f"[run_simulation] Error: No data available for {self.TARGET_DAY}")
             return
 
+        # scale only the rows the day's windows touch; reported prices come from the raw float64 bars
+        first_row = max(0, day_positions[0] - self.TIME_STEPS + 1)
+        rows = df_featured_full.iloc[first_row: day_positions[-1] + 1]
+        with stage_seconds.time(stage="scaling", ticker=self.TICKER):
+            price_matrix = FeatureMatrix.from_frame(rows, self.PRICE_FEATURES, price_scaler, self.TIME_STEPS)
+            trend_matrix = FeatureMatrix.from_frame(rows, trend_features, trend_scaler, self.TIME_STEPS)
+        closes = full_df_5min['close'].reindex(rows.index).to_numpy()
+        signal_inputs = rows[SIGNAL_COLUMNS].to_numpy(dtype=np.float64)
+        day_index = df_featured_full.index[day_positions]
+        del full_df_5min, df_featured_full, rows
+
         print(f"\n--- Simulating trading day for {self.TARGET_DAY} ---")
 
-        for current_timestamp in simulation_day.index:
-            end_idx_loc = df_featured_full.index.get_loc(current_timestamp)
+        for current_timestamp, end_idx_loc in zip(day_index, day_positions):
             start_idx_loc = end_idx_loc - self.TIME_STEPS + 1
+            row_loc = end_idx_loc - first_row
 
             # slice bounds check
             if start_idx_loc < 0:
                 if save_placeholders:
                     # save placeholder for this time (no prediction yet)
                     placeholder = {
-                        "ticker": "TATAMOTORS",
-                        "current_price": float(full_df_5min.loc[current_timestamp]["close"]),
+                        "ticker": self.TICKER,
+                        "current_price": float(closes[row_loc]),
                         "predicted_price": None,
                         "trend": "N/A",
                         "confidence": 0.0,
                         "prediction_for": str(current_timestamp.time()),
-                        "timestamp": datetime.utcnow().isoformat(),
+                        "timestamp": self.clock.now().isoformat(),
                         "simulation_date": str(current_timestamp.date())
                     }
-                    self.save_prediction("TATAMOTORS", placeholder)
+                    self.save_prediction(self.TICKER, placeholder)
                 else:
                     print(f"[{current_timestamp.time()}] Not enough history yet; skipping.")
                 if sleep_seconds:
-                    time.sleep(sleep_seconds)
-                continue
-
-            historical_window = df_featured_full.iloc[start_idx_loc: end_idx_loc + 1]
-            if len(historical_window) < self.TIME_STEPS:
-                if save_placeholders:
-                    placeholder = {
-                        "ticker": "TATAMOTORS",
-                        "current_price": float(full_df_5min.loc[current_timestamp]["close"]),
-                        "predicted_price": None,
-                        "trend": "N/A",
-                        "confidence": 0.0,
-                        "prediction_for": str(current_timestamp.time()),
-                        "timestamp": datetime.utcnow().isoformat(),
-                        "simulation_date": str(current_timestamp.date())
-                    }
-                    self.save_prediction("TATAMOTORS", placeholder)
-                else:
-                    print(f"[{current_timestamp.time()}] Historical window too short; skipping.")
-                if sleep_seconds:
-                    time.sleep(sleep_seconds)
+                    self.clock.sleep(sleep_seconds)
                 continue
 
             # make predictions
             try:
-                price, trend_dir, trend_conf = self.get_combined_prediction(
-                    historical_window, models, scalers, trend_features
+                price, trend_dir, trend_conf = self.predict_window(
+                    backend, price_matrix.window(row_loc), trend_matrix.window(row_loc), closes[row_loc]
                 )
             except Exception as e:
                 print(f"[{current_timestamp.time()}] Prediction error: {e}")
                 # save placeholder to keep timeline continuity
                 placeholder = {
-                    "ticker": "TATAMOTORS",
-                    "current_price": float(historical_window.iloc[-1]['close']),
+                    "ticker": self.TICKER,
+                    "current_price": float(closes[row_loc]),
                     "predicted_price": None,
                     "trend": "N/A",
                     "confidence": 0.0,
                     "prediction_for": str((current_timestamp + pd.Timedelta(minutes=5)).time()),
-                    "timestamp": datetime.utcnow().isoformat(),
+                    "timestamp": self.clock.now().isoformat(),
                     "simulation_date": str(current_timestamp.date())
                 }
-                self.save_prediction("TATAMOTORS", placeholder)
+                self.save_prediction(self.TICKER, placeholder)
                 if sleep_seconds:
-                    time.sleep(sleep_seconds)
+                    self.clock.sleep(sleep_seconds)
                 continue
 
-            current_price = historical_window.iloc[-1]['close']
+            current_price = closes[row_loc]
             next_interval_start = current_timestamp + pd.Timedelta(minutes=5)
+            atr, ma_short, ma_long = signal_inputs[row_loc]
 
             result = {
-                "ticker": "TATAMOTORS",
+                "ticker": self.TICKER,
                 "current_price": float(current_price),
                 "predicted_price": float(price),
                 "trend": trend_dir,
                 "confidence": float(trend_conf),
+                "atr": float(atr),
+                "ma_short": float(ma_short),
+                "ma_long": float(ma_long),
                 "prediction_for": str(next_interval_start.time()),
-                "timestamp": datetime.utcnow().isoformat(),
+                "timestamp": self.clock.now().isoformat(),
                 "simulation_date": str(current_timestamp.date())
             }
 
-            self.save_prediction("TATAMOTORS", result)
+            self.save_prediction(self.TICKER, result)
 
             if sleep_seconds:
-                time.sleep(sleep_seconds)
+                self.clock.sleep(sleep_seconds)
 
         print("\n--- Simulation Complete ---")
+
+
+    def run_backtest(self, start_date: str = None, end_date: str = None,
+                     batch_size: int = 256, save_placeholders: bool = True):
+        """
+        Batched replay of one or more trading days (defaults to TARGET_DAY).
+        Every 60-step window in the range is built up front and each model runs
+        once over the whole (N, 60, F) tensor in chunks of batch_size; results
+        are bulk-written with save_predictions. Returns the list of results.
+        """
+        start_date = start_date or self.TARGET_DAY
+        end_date = end_date or start_date
+        print(f"--- Starting batched backtest {start_date} -> {end_date} ---")
+
+        try:
+            models, scalers, trend_features = self.load_artifacts()
+            backend = self.load_backend(models)
+            price_scaler, trend_scaler = scalers['price'], scalers['trend']
+        except Exception as e:
+            print(f"[run_backtest] Error loading models/scalers: {e}")
+            return []
+
+        try:
+            full_df_5min = self.load_history()
+            df_featured_full = self.featured_history(full_df_5min)
+        except Exception as e:
+            print(f"[run_backtest] Error preparing data: {e}")
+            return []
+
+        dates = df_featured_full.index.date
+        in_range = (dates >= pd.to_datetime(start_date).date()) & (dates <= pd.to_datetime(end_date).date())
+        positions = np.flatnonzero(in_range)
+        if len(positions) == 0:
+            print(f"[run_backtest] Error: No data available for {start_date} -> {end_date}")
+            return []
+
+        ready = positions[positions >= self.TIME_STEPS - 1]
+        results = []
+
+        if save_placeholders:
+            for pos in positions[positions < self.TIME_STEPS - 1]:
+                ts = df_featured_full.index[pos]
+                results.append({
+                    "ticker": self.TICKER,
+                    "current_price": float(full_df_5min.loc[ts]["close"]),
+                    "predicted_price": None,
+                    "trend": "N/A",
+                    "confidence": 0.0,
+                    "prediction_for": str(ts.time()),
+                    "timestamp": self.clock.now().isoformat(),
+                    "simulation_date": str(ts.date())
+                })
+
+        if len(ready):
+            # scale only the rows the windows touch, once, then take strided windows
+            first_row = ready[0] - self.TIME_STEPS + 1
+            rows = df_featured_full.iloc[first_row: ready[-1] + 1]
+            with stage_seconds.time(stage="scaling", ticker=self.TICKER):
+                X_price = FeatureMatrix.from_frame(rows, self.PRICE_FEATURES, price_scaler, self.TIME_STEPS).windows(ready - first_row)
+                X_trend = FeatureMatrix.from_frame(rows, trend_features, trend_scaler, self.TIME_STEPS).windows(ready - first_row)
+
+            t0 = time.perf_counter()
+            scaled_price_preds, trend_probs = backend.predict(X_price, X_trend, batch_size=batch_size)
+            print(f"[run_backtest] Inference for {len(ready)} windows took {time.perf_counter() - t0:.3f}s")
+
+            last_closes = full_df_5min['close'].reindex(df_featured_full.index[ready]).to_numpy()
+            predicted_prices = last_closes * (1 + scaled_price_preds / self.SCALE_FACTOR)
+            signal_inputs = df_featured_full[SIGNAL_COLUMNS].to_numpy(dtype=np.float64)[ready]
+
+            for pos, current_price, price, trend_prob, (atr, ma_short, ma_long) in zip(
+                    ready, last_closes, predicted_prices, trend_probs, signal_inputs):
+                ts = df_featured_full.index[pos]
+                results.append({
+                    "ticker": self.TICKER,
+                    "current_price": float(current_price),
+                    "predicted_price": float(price),
+                    "trend": "UP" if trend_prob > 0.5 else "DOWN",
+                    "confidence": float(trend_prob),
+                    "atr": float(atr),
+                    "ma_short": float(ma_short),
+                    "ma_long": float(ma_long),
+                    "prediction_for": str((ts + pd.Timedelta(minutes=5)).time()),
+                    "timestamp": self.clock.now().isoformat(),
+                    "simulation_date": str(ts.date())
+                })
+
+        self.save_predictions(self.TICKER, results)
+        print("\n--- Backtest Complete ---")
+        return results
@@ -4,6 +4,12 @@ from datetime import datetime, timezone
 from typing import Dict, Any, Tuple, Literal
 import numpy as np
 
+_VOLATILITY_STATES = ("VOLATILE", "QUIET")
+_TREND_STATES = ("TRENDING", "RANGING")
+# Regime index of the batch path: 2 * (not volatile) + (not trending), i.e. this order
+REGIMES = tuple(f"{v}_{t}" for v in _VOLATILITY_STATES for t in _TREND_STATES)
+_SIGNALS = np.array(["HOLD", "BUY", "SELL"])
+
 class SignalAgent:
     """
     A sophisticated, regime-aware signal agent that adjusts its strategy
@@ -23,6 +29,72 @@ class SignalAgent:
         trend = "TRENDING" if (price > ma_short > ma_long) or (price < ma_short < ma_long) else "RANGING"
         return volatility, trend
 
+    def regime_table(self, regime_configs: Dict[str, Any] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Weights (trend, news, price) and thresholds (buy, sell) per regime, in REGIMES order."""
+        regime_configs = regime_configs or self.regime_configs
+        configs = [regime_configs.get(regime, regime_configs["QUIET_RANGING"]) for regime in REGIMES]
+        weights = np.array([[c["weights"]["trend"], c["weights"]["news"], c["weights"]["price"]] for c in configs])
+        thresholds = np.array([[c["thresholds"]["buy"], c["thresholds"]["sell"]] for c in configs])
+        return weights, thresholds
+
+    @staticmethod
+    def market_regimes(atr, price, ma_short, ma_long) -> Tuple[np.ndarray, np.ndarray]:
+        """Vectorized _get_market_regime: (index into REGIMES, trending mask) per row."""
+        atr, price, ma_short, ma_long = (np.asarray(a, dtype=np.float64) for a in (atr, price, ma_short, ma_long))
+        volatile = atr > price * 0.01
+        trending = ((price > ma_short) & (ma_short > ma_long)) | ((price < ma_short) & (ma_short < ma_long))
+        return 2 * (~volatile) + (~trending), trending
+
+    @staticmethod
+    def component_scores(trend_prob, predicted_price, current_price) -> Tuple[np.ndarray, np.ndarray]:
+        """(trend_score, price_diff) per row, as in generate_signal."""
+        trend_prob = np.asarray(trend_prob, dtype=np.float64)
+        predicted_price = np.asarray(predicted_price, dtype=np.float64)
+        current_price = np.asarray(current_price, dtype=np.float64)
+        price_diff = np.divide(predicted_price - current_price, current_price,
+                               out=np.zeros(np.broadcast(predicted_price, current_price).shape),
+                               where=current_price != 0)
+        return trend_prob * 2 - 1, price_diff
+
+    @staticmethod
+    def score_signals(regime: np.ndarray, trending: np.ndarray, trend_score: np.ndarray, news_score,
+                      price_diff: np.ndarray, weights: np.ndarray, thresholds: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Steps 3-5 of generate_signal for precomputed regimes and component
+        scores: combined score, signal code (0 HOLD, 1 BUY, 2 SELL) and
+        confidence per row, with weights/thresholds from regime_table().
+        """
+        w = weights[regime]
+        combined_score = w[..., 0] * trend_score + w[..., 1] * news_score + w[..., 2] * price_diff
+        t = thresholds[regime]
+        code = np.where(combined_score >= t[..., 0], 1, np.where(combined_score <= t[..., 1], 2, 0))
+        is_aligned = trending & (((code == 1) & (trend_score > 0)) | ((code == 2) & (trend_score < 0)))
+        confidence = np.tanh(np.abs(combined_score) * np.where(is_aligned, 1.2, 0.8))
+        return {"combined_score": combined_score, "signal_code": code, "confidence": confidence}
+
+    def generate_signals(self, trend_prob, news_score, current_price, predicted_price,
+                         atr, ma_short, ma_long) -> Dict[str, np.ndarray]:
+        """
+        Batch generate_signal over columnar inputs (one row per ticker or
+        timestamp; scalars broadcast). Returns columns: signal, confidence,
+        combined_score, price_diff, market_regime. Values match the scalar
+        path, which additionally rounds confidence, combined_score and
+        price_diff to 4 places.
+        """
+        columns = (trend_prob, news_score, current_price, predicted_price, atr, ma_short, ma_long)
+        trend_prob, news_score, current_price, predicted_price, atr, ma_short, ma_long = np.broadcast_arrays(
+            *(np.atleast_1d(np.asarray(c, dtype=np.float64)) for c in columns))
+        regime, trending = self.market_regimes(atr, current_price, ma_short, ma_long)
+        trend_score, price_diff = self.component_scores(trend_prob, predicted_price, current_price)
+        scores = self.score_signals(regime, trending, trend_score, news_score, price_diff, *self.regime_table())
+        return {
+            "signal": _SIGNALS[scores["signal_code"]],
+            "confidence": scores["confidence"],
+            "combined_score": scores["combined_score"],
+            "price_diff": price_diff,
+            "market_regime": np.array(REGIMES)[regime],
+        }
+
     def generate_signal(self, signal_data: Dict[str, Any]) -> Dict[str, Any]:
         """Generates a trading signal based on a dynamic, regime-aware analysis."""
         
@@ -0,0 +1,282 @@
+"""
+Replays stored predictions through SignalAgent's regime logic and sweeps
+alternative weights/thresholds for SignalAgent.regime_configs.
+
+    cd backend && python -m agents.signalSweep --tickers TATAMOTORS,INFY \
+        [--start 2025-05-01] [--end 2025-07-31] [--news news_scores.csv] \
+        [--search grid|random] [--samples 5000] [--workers 8] [--out sweep.csv]
+
+Each stored prediction (predictions:{ticker}:history) becomes a row: its
+regime, trend score, news score and price diff are computed once, together
+with the return of the candle it forecast (the next stored close). Every
+configuration is then just a re-weighting of those columns, scored on a
+process pool that receives the columns once per worker. A BUY/SELL is a hit
+when the next close moved its way; the PnL proxy is the summed next-candle
+return (%) of going long on BUY and short on SELL.
+
+Stored predictions carry no trend_prob, so `confidence` (the trend model's
+P(up)) stands in for it. Predictions saved without atr/ma_short/ma_long
+(history written before those fields were stored) are dropped, since their
+regime can't be determined; re-run the backtest to include those days.
+News scores are not stored either: --news reads a CSV with timestamp,
+news_score and optionally ticker columns (each candle takes the latest
+score at or before it); without it news_score is 0.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from itertools import product
+from multiprocessing import get_context
+
+import numpy as np
+import pandas as pd
+
+from agents.signalAgent import REGIMES, SignalAgent
+from database.predictionStore import prediction_store
+
+_METRICS = ("trades", "buys", "sells", "hits", "pnl_pct")
+_REGIME_INPUTS = ("atr", "ma_short", "ma_long")
+
+# Per-process replay columns of a worker
+_worker = {}
+
+
+def load_signal_history(tickers, start: str = None, end: str = None, news: pd.DataFrame = None,
+                        store=prediction_store) -> pd.DataFrame:
+    """
+    Stored predictions of `tickers` in [start, end] as one table (one row per
+    candle), with the signal inputs and next_return, the return of the candle
+    each prediction was for (NaN when that candle isn't stored). Predictions
+    without the regime inputs (atr, ma_short, ma_long) are dropped, with a
+    warning.
+    """
+    start_dt = datetime.fromisoformat(start) if start else None
+    end_dt = datetime.fromisoformat(end) if end else None
+    if end_dt is not None and len(end) == 10:  # a bare date means the whole day
+        end_dt = end_dt.replace(hour=23, minute=59, second=59)
+
+    tables = []
+    for ticker in tickers:
+        rows = [r for r in store.range(ticker, start_dt, end_dt) if r.get("predicted_price") is not None]
+        if not rows:
+            print(f"[signalSweep] {ticker}: no stored predictions in range")
+            continue
+        frame = pd.DataFrame({
+            "ticker": ticker,
+            "target": pd.to_datetime([f"{r['simulation_date']} {r['prediction_for']}" for r in rows]),
+            "current_price": [float(r["current_price"]) for r in rows],
+            "predicted_price": [float(r["predicted_price"]) for r in rows],
+            "trend_prob": [float(r.get("trend_prob", r.get("confidence", 0.5))) for r in rows],
+            **{k: [np.nan if r.get(k) is None else float(r[k]) for r in rows] for k in _REGIME_INPUTS},
+        })
+        frame["timestamp"] = frame.pop("target") - pd.Timedelta(minutes=5)
+        # the close of the forecast candle is the current_price of the prediction made on it
+        closes = frame.set_index("timestamp")["current_price"]
+        next_close = closes.reindex(frame["timestamp"] + pd.Timedelta(minutes=5)).to_numpy()
+        frame["next_return"] = next_close / frame["current_price"].to_numpy() - 1
+
+        missing = frame[list(_REGIME_INPUTS)].isna().any(axis=1)
+        if missing.any():
+            print(f"[signalSweep] ⚠️ {ticker}: dropped {int(missing.sum())} of {len(frame)} predictions "
+                  f"without {'/'.join(_REGIME_INPUTS)}")
+            frame = frame[~missing]
+        if frame.empty:
+            continue
+        tables.append(frame)
+    if not tables:
+        return pd.DataFrame()
+
+    table = pd.concat(tables, ignore_index=True)
+    table["news_score"] = _news_scores(table, news)
+    return table
+
+
+def _news_scores(table: pd.DataFrame, news: pd.DataFrame = None) -> np.ndarray:
+    """Latest news score at or before each row's candle (per ticker when news has a ticker column)."""
+    scores = np.zeros(len(table))
+    if news is None or news.empty:
+        return scores
+    news = news.assign(timestamp=pd.to_datetime(news["timestamp"])).sort_values("timestamp")
+    for ticker, rows in table.groupby("ticker"):
+        ticker_news = news[news["ticker"] == ticker] if "ticker" in news.columns else news
+        if ticker_news.empty:
+            continue
+        positions = np.searchsorted(ticker_news["timestamp"].to_numpy(), rows["timestamp"].to_numpy(), side="right") - 1
+        values = ticker_news["news_score"].to_numpy(dtype=np.float64)
+        scores[rows.index] = np.where(positions >= 0, values[np.maximum(positions, 0)], 0.0)
+    return scores
+
+
+def replay_columns(table: pd.DataFrame) -> dict:
+    """The config-independent part of the signal logic, computed once for the whole sweep."""
+    regime, trending = SignalAgent.market_regimes(table["atr"], table["current_price"],
+                                                  table["ma_short"], table["ma_long"])
+    trend_score, price_diff = SignalAgent.component_scores(table["trend_prob"], table["predicted_price"],
+                                                           table["current_price"])
+    return {
+        "regime": regime,
+        "trending": trending,
+        "trend_score": trend_score,
+        "news_score": table["news_score"].to_numpy(dtype=np.float64),
+        "price_diff": price_diff,
+        "next_return": table["next_return"].to_numpy(dtype=np.float64),
+    }
+
+
+def evaluate(columns: dict, weights: np.ndarray, thresholds: np.ndarray) -> np.ndarray:
+    """trades, buys, sells, hits and PnL proxy (%) of one configuration (regime_table() arrays)."""
+    code = SignalAgent.score_signals(columns["regime"], columns["trending"], columns["trend_score"],
+                                     columns["news_score"], columns["price_diff"], weights, thresholds)["signal_code"]
+    position = (code == 1).astype(np.float64) - (code == 2)
+    next_return = columns["next_return"]
+    scored = ~np.isnan(next_return) & (position != 0)
+    moves = position[scored] * next_return[scored]
+    return np.array([scored.sum(), (code[scored] == 1).sum(), (code[scored] == 2).sum(),
+                     (moves > 0).sum(), moves.sum() * 100])
+
+
+def _init_worker(columns: dict):
+    _worker["columns"] = columns
+
+
+def _evaluate_chunk(start: int, weights: np.ndarray, thresholds: np.ndarray):
+    columns = _worker["columns"]
+    return start, np.array([evaluate(columns, w, t) for w, t in zip(weights, thresholds)])
+
+
+def _simplex(step: float) -> list:
+    """(trend, news, price) weights on a grid of `step` that sum to 1."""
+    n = int(round(1 / step))
+    return [(i / n, j / n, (n - i - j) / n) for i in range(n + 1) for j in range(n + 1 - i)]
+
+
+def _config(weights: np.ndarray, thresholds: np.ndarray) -> dict:
+    """regime_configs-shaped dict of regime_table() arrays."""
+    return {
+        regime: {
+            "weights": dict(zip(("trend", "news", "price"), np.round(weights[i], 6).tolist())),
+            "thresholds": dict(zip(("buy", "sell"), np.round(thresholds[i], 6).tolist())),
+        }
+        for i, regime in enumerate(REGIMES)
+    }
+
+
+def grid_configs(base: dict, weight_step: float = 0.1, buy_thresholds=(0.3, 0.4, 0.5, 0.6, 0.7, 0.8),
+                 regimes=REGIMES):
+    """
+    The base configuration plus, for each of `regimes` in turn, every weight
+    triple on the simplex grid with every symmetric (buy, -buy) threshold,
+    the other regimes keeping their base values. Returns stacked
+    (weights, thresholds) arrays of shape (n, 4, 3) and (n, 4, 2).
+    """
+    base_weights, base_thresholds = SignalAgent().regime_table(base)
+    weights, thresholds = [base_weights], [base_thresholds]
+    for regime in regimes:
+        i = REGIMES.index(regime)
+        for triple, buy in product(_simplex(weight_step), buy_thresholds):
+            w, t = base_weights.copy(), base_thresholds.copy()
+            w[i], t[i] = triple, (buy, -buy)
+            weights.append(w)
+            thresholds.append(t)
+    return np.stack(weights), np.stack(thresholds)
+
+
+def random_configs(base: dict, samples: int = 5000, seed: int = 0, buy_range=(0.2, 0.9)):
+    """The base configuration plus `samples` random ones: Dirichlet weights and symmetric thresholds per regime."""
+    base_weights, base_thresholds = SignalAgent().regime_table(base)
+    rng = np.random.default_rng(seed)
+    weights = rng.dirichlet(np.ones(3), size=(samples, len(REGIMES)))
+    buy = rng.uniform(*buy_range, size=(samples, len(REGIMES)))
+    thresholds = np.stack([buy, -buy], axis=-1)
+    return np.concatenate([base_weights[None], weights]), np.concatenate([base_thresholds[None], thresholds])
+
+
+def run_sweep(table: pd.DataFrame, weights: np.ndarray, thresholds: np.ndarray, workers: int = None,
+              chunk_size: int = 100, min_trades: int = 20) -> pd.DataFrame:
+    """
+    Scores every configuration over the replay table on a process pool and
+    returns them ranked by hit rate, then PnL proxy. Configurations with
+    fewer than min_trades scored signals are ranked last. Row 0 of the
+    inputs (config_id 0) is the configuration they were generated from.
+    """
+    workers = workers or os.cpu_count() or 1
+    columns = replay_columns(table)
+    print(f"--- Sweeping {len(weights)} configurations over {len(table)} candles on {workers} workers ---")
+
+    t0 = time.perf_counter()
+    metrics = np.zeros((len(weights), len(_METRICS)))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"),
+                             initializer=_init_worker, initargs=(columns,)) as pool:
+        futures = [pool.submit(_evaluate_chunk, start, weights[start:start + chunk_size],
+                               thresholds[start:start + chunk_size])
+                   for start in range(0, len(weights), chunk_size)]
+        for future in as_completed(futures):
+            start, chunk = future.result()
+            metrics[start:start + len(chunk)] = chunk
+    print(f"[signalSweep] {len(weights)} configurations scored in {time.perf_counter() - t0:.2f}s")
+
+    results = pd.DataFrame(metrics, columns=_METRICS)
+    results[["trades", "buys", "sells", "hits"]] = results[["trades", "buys", "sells", "hits"]].astype(int)
+    results.insert(0, "config_id", np.arange(len(weights)))
+    results["hit_rate"] = np.divide(results["hits"], results["trades"],
+                                    out=np.zeros(len(results)), where=results["trades"] > 0)
+    results["pnl_per_trade_pct"] = np.divide(results["pnl_pct"], results["trades"],
+                                             out=np.zeros(len(results)), where=results["trades"] > 0)
+    results["config"] = [json.dumps(_config(w, t)) for w, t in zip(weights, thresholds)]
+    results["eligible"] = results["trades"] >= min_trades
+    results = results.sort_values(["eligible", "hit_rate", "pnl_pct"], ascending=False, ignore_index=True)
+    results.insert(0, "rank", np.arange(1, len(results) + 1))
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", default="TATAMOTORS", help="comma-separated")
+    parser.add_argument("--start", default=None, help="ISO date/datetime, inclusive")
+    parser.add_argument("--end", default=None, help="ISO date/datetime, inclusive")
+    parser.add_argument("--news", default=None, help="CSV of timestamp,news_score[,ticker]")
+    parser.add_argument("--search", choices=("grid", "random"), default="grid")
+    parser.add_argument("--weight-step", type=float, default=0.1, help="grid: weight resolution")
+    parser.add_argument("--thresholds", default="0.3,0.4,0.5,0.6,0.7,0.8", help="grid: buy thresholds (sell = -buy)")
+    parser.add_argument("--regimes", default=",".join(REGIMES), help="grid: regimes to vary, comma-separated")
+    parser.add_argument("--samples", type=int, default=5000, help="random: number of configurations")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=100, help="configurations per task")
+    parser.add_argument("--min-trades", type=int, default=20)
+    parser.add_argument("--top", type=int, default=10, help="configurations to print")
+    parser.add_argument("--out", default=None, help="write the ranked table to this CSV")
+    args = parser.parse_args(argv)
+
+    news = pd.read_csv(args.news) if args.news else None
+    table = load_signal_history([t.strip() for t in args.tickers.split(",") if t.strip()],
+                                args.start, args.end, news)
+    if table.empty:
+        return 1
+
+    base = SignalAgent().regime_configs
+    if args.search == "grid":
+        weights, thresholds = grid_configs(base, args.weight_step,
+                                           [float(t) for t in args.thresholds.split(",") if t],
+                                           [r.strip() for r in args.regimes.split(",") if r.strip()])
+    else:
+        weights, thresholds = random_configs(base, args.samples, args.seed)
+
+    results = run_sweep(table, weights, thresholds, workers=args.workers, chunk_size=args.chunk_size,
+                        min_trades=args.min_trades)
+    current = results[results["config_id"] == 0].iloc[0]
+    print(f"Current regime_configs: rank {current['rank']}, hit rate {current['hit_rate']:.3f}, "
+          f"PnL {current['pnl_pct']:.2f}% over {current['trades']} trades")
+    for r in results.head(args.top).itertuples():
+        print(f"#{r.rank}: hit rate {r.hit_rate:.3f}, PnL {r.pnl_pct:.2f}% over {r.trades} trades -> {r.config}")
+    if args.out:
+        results.to_csv(args.out, index=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
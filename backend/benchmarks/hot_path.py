@@ -0,0 +1,235 @@
+"""
+Benchmarks for the prediction hot path, on seeded synthetic bars:
+
+- add_features throughput against the number of 5-minute rows
+- single-window vs batched inference, per Keras model and for INFERENCE_BACKEND
+- resident bytes per candle of the 5-minute bars and of the featured history
+- end-to-end candles per second of TrendPredict.run_simulation(sleep_seconds=0)
+  (needs Redis, since every prediction is saved)
+
+Results are written as JSON with a flat "metrics" map, so two runs can be
+compared directly. From backend/:
+
+    python -m benchmarks.hot_path --out bench_before.json
+    python -m benchmarks.hot_path --out bench_after.json --baseline bench_before.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import write_minute_csv
+from Pred_models.data_cache import CACHE_DIR
+from Pred_models.trend_pred_new import TrendPredict
+
+BENCH_TICKER = "BENCH"
+
+
+def _timed(fn, repeats: int) -> dict:
+    """Best and median wall time of fn() over `repeats` runs (after one untimed run)."""
+    fn()
+    samples = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return {"best_seconds": min(samples), "median_seconds": statistics.median(samples)}
+
+
+def bench_add_features(predictor: TrendPredict, df_5min: pd.DataFrame, sizes, repeats: int) -> list:
+    results = []
+    for rows in sizes:
+        frame = df_5min.iloc[-rows:]
+        timing = _timed(lambda: predictor.add_features(frame), repeats)
+        results.append({"rows": len(frame), **timing,
+                        "rows_per_second": len(frame) / timing["best_seconds"]})
+    return results
+
+
+def bench_memory(predictor: TrendPredict, df_5min: pd.DataFrame) -> dict:
+    featured = predictor.add_features(df_5min)
+    bars_bytes = int(df_5min.memory_usage(index=True).sum())
+    featured_bytes = int(featured.memory_usage(index=True).sum())
+    return {
+        "rows": len(featured),
+        "bars_bytes_per_candle": bars_bytes / len(df_5min),
+        "featured_bytes_per_candle": featured_bytes / len(featured),
+        "featured_dtypes": sorted({str(dtype) for dtype in featured.dtypes}),
+    }
+
+
+def _single_vs_batched(predict_one, predict_all, windows: int, batch_size: int, repeats: int) -> dict:
+    single = _timed(lambda: [predict_one(i) for i in range(windows)], repeats)
+    batched = _timed(predict_all, repeats)
+    return {
+        "windows": windows,
+        "batch_size": batch_size,
+        "single_ms_per_window": single["best_seconds"] / windows * 1000,
+        "batched_ms_per_window": batched["best_seconds"] / windows * 1000,
+        "batched_speedup": single["best_seconds"] / batched["best_seconds"],
+    }
+
+
+def bench_inference(predictor: TrendPredict, windows: int, batch_size: int, repeats: int, seed: int) -> dict:
+    """
+    Random scaled windows through each Keras model's predict() (what the
+    'keras' backend does per model) and through the configured backend.
+    """
+    models, _, _ = predictor.load_artifacts()
+    backend = predictor.load_backend(models)
+    rng = np.random.default_rng(seed)
+    X_price = rng.standard_normal((windows,) + backend.input_shapes[0]).astype(np.float32)
+    X_trend = rng.standard_normal((windows,) + backend.input_shapes[1]).astype(np.float32)
+
+    results = {}
+    for name, model in models.items():
+        X = X_price if name == "price_lstm" else X_trend
+        results[name] = _single_vs_batched(
+            lambda i: model.predict(X[i:i + 1], verbose=0),
+            lambda: model.predict(X, batch_size=batch_size, verbose=0),
+            windows, batch_size, repeats,
+        )
+    results[f"backend_{backend.name}"] = _single_vs_batched(
+        lambda i: backend.predict(X_price[i:i + 1], X_trend[i:i + 1]),
+        lambda: backend.predict(X_price, X_trend, batch_size=batch_size),
+        windows, batch_size, repeats,
+    )
+    return results
+
+
+def bench_simulation(predictor: TrendPredict, repeats: int) -> dict:
+    featured = predictor.featured_history(predictor.load_history())
+    candles = int((featured.index.date == pd.to_datetime(predictor.TARGET_DAY).date()).sum())
+    from database.predictionStore import prediction_store
+    try:
+        timing = _timed(lambda: predictor.run_simulation(sleep_seconds=0), repeats)
+    except Exception as e:
+        print(f"[benchmarks] run_simulation failed (is Redis up?): {e}")
+        return {"candles": candles, "error": str(e)}
+    finally:
+        try:
+            prediction_store.client.delete(f"predictions:{BENCH_TICKER}:history", f"predictions:{BENCH_TICKER}:latest")
+        except Exception:
+            pass
+    return {"candles": candles, **timing, "candles_per_second": candles / timing["best_seconds"]}
+
+
+def _environment() -> dict:
+    here = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=here, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=here,
+                                    capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        commit, dirty = None, None
+    tf = sys.modules.get("tensorflow")
+    return {
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "tensorflow": getattr(tf, "__version__", None),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "inference_backend": os.getenv("INFERENCE_BACKEND", "compiled"),
+    }
+
+
+def _flatten(results: dict) -> dict:
+    """The comparable numbers, keyed e.g. add_features.rows_per_second@5000."""
+    metrics = {}
+    for row in results.get("add_features", []):
+        metrics[f"add_features.rows_per_second@{row['rows']}"] = row["rows_per_second"]
+    for key in ("bars_bytes_per_candle", "featured_bytes_per_candle"):
+        if key in results.get("memory", {}):
+            metrics[f"memory.{key}"] = results["memory"][key]
+    for name, row in results.get("inference", {}).items():
+        for key in ("single_ms_per_window", "batched_ms_per_window"):
+            metrics[f"inference.{name}.{key}"] = row[key]
+    if "candles_per_second" in results.get("simulation", {}):
+        metrics["simulation.candles_per_second"] = results["simulation"]["candles_per_second"]
+    return metrics
+
+
+def compare(baseline: dict, current: dict) -> list:
+    """Per shared metric: (name, baseline, current, % change, better?). *_per_second is higher-is-better."""
+    rows = []
+    for name, new in current["metrics"].items():
+        old = baseline.get("metrics", {}).get(name)
+        if old is None:
+            continue
+        change = (new - old) / old * 100
+        better = change > 0 if "_per_second" in name else change < 0
+        rows.append((name, old, new, change, better))
+    return rows
+
+
+def run(days: int = 300, seed: int = 0, sizes=(1000, 5000, 20000), windows: int = 256,
+        batch_size: int = 256, repeats: int = 3, skip=()) -> dict:
+    data_file = write_minute_csv(os.path.join(CACHE_DIR, "benchmarks", f"{BENCH_TICKER}_{days}d_seed{seed}.csv"),
+                                 days=days, seed=seed)
+    predictor = TrendPredict(BENCH_TICKER, data_file=data_file)
+    df_5min = predictor.load_history()
+    predictor.TARGET_DAY = str(df_5min.index[-1].date())
+
+    results = {"params": {"days": days, "seed": seed, "rows_5min": len(df_5min), "windows": windows,
+                          "batch_size": batch_size, "repeats": repeats, "target_day": predictor.TARGET_DAY}}
+    if "add_features" not in skip:
+        print("[benchmarks] add_features ...")
+        results["add_features"] = bench_add_features(predictor, df_5min, [s for s in sizes if s <= len(df_5min)], repeats)
+    if "memory" not in skip:
+        results["memory"] = bench_memory(predictor, df_5min)
+    if "inference" not in skip:
+        print("[benchmarks] inference ...")
+        results["inference"] = bench_inference(predictor, windows, batch_size, repeats, seed)
+    if "simulation" not in skip:
+        print("[benchmarks] run_simulation ...")
+        results["simulation"] = bench_simulation(predictor, repeats)
+    return {"environment": _environment(), "results": results, "metrics": _flatten(results)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the prediction hot path on synthetic bars.")
+    parser.add_argument("--out", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--baseline", help="JSON report of an earlier run to compare against")
+    parser.add_argument("--days", type=int, default=300, help="trading days of synthetic minute bars")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sizes", default="1000,5000,20000", help="add_features row counts, comma-separated")
+    parser.add_argument("--windows", type=int, default=256, help="windows per inference measurement")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--skip", default="", help="comma-separated: add_features,memory,inference,simulation")
+    args = parser.parse_args(argv)
+
+    report = run(days=args.days, seed=args.seed, sizes=[int(s) for s in args.sizes.split(",") if s],
+                 windows=args.windows, batch_size=args.batch_size, repeats=args.repeats,
+                 skip=[s for s in args.skip.split(",") if s])
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+        print(f"[benchmarks] Wrote {args.out}")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"\n--- vs {args.baseline} ({baseline.get('environment', {}).get('commit')}) ---")
+        for name, old, new, change, better in compare(baseline, report):
+            print(f"{'✅' if better else '⚠️ '} {name}: {old:.4g} -> {new:.4g} ({change:+.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
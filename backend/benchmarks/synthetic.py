@@ -0,0 +1,42 @@
+"""
+Seeded synthetic minute bars, so benchmarks don't need the proprietary CSVs.
+
+Bars follow the NSE session (09:15-15:29, weekdays) with a geometric random
+walk close, open at the previous close, high/low just outside the body and
+log-normal volume. The same (days, seed, start) always gives the same bars.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+SESSION_START = "09:15"
+BARS_PER_DAY = 375  # 09:15 through 15:29
+
+
+def synthetic_minute_bars(days: int = 30, seed: int = 0, start: str = "2025-06-02",
+                          start_price: float = 500.0, volatility: float = 0.0005) -> pd.DataFrame:
+    """Minute OHLCV for `days` trading days, indexed by a 'date' DatetimeIndex."""
+    rng = np.random.default_rng(seed)
+    sessions = pd.bdate_range(start, periods=days)
+    offsets = pd.to_timedelta(np.arange(BARS_PER_DAY), unit="min") + pd.Timedelta(SESSION_START + ":00")
+    index = pd.DatetimeIndex((sessions.values[:, None] + offsets.values[None, :]).ravel(), name="date")
+
+    n = len(index)
+    close = start_price * np.exp(np.cumsum(rng.normal(0, volatility, n)))
+    open_ = np.r_[start_price, close[:-1]]
+    wick = rng.uniform(0, volatility, (2, n))
+    high = np.maximum(open_, close) * (1 + wick[0])
+    low = np.minimum(open_, close) * (1 - wick[1])
+    volume = np.round(rng.lognormal(7, 0.5, n))
+    return pd.DataFrame({"open": open_, "high": high, "low": low, "close": close, "volume": volume}, index=index)
+
+
+def write_minute_csv(path: str, days: int = 30, seed: int = 0, start: str = "2025-06-02") -> str:
+    """Writes the bars in the layout of Pred_models/{ticker}_minute.csv, unless already there."""
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.tmp-{os.getpid()}"
+        synthetic_minute_bars(days, seed, start).to_csv(tmp)
+        os.replace(tmp, path)
+    return path
@@ -0,0 +1,52 @@
+import json
+import os
+from typing import Dict, Iterable
+
+from database.redisClient import redis_client
+
+# Set to 0 to always warm up from history on start instead of resuming
+PREDICTOR_CHECKPOINTS = os.getenv("PREDICTOR_CHECKPOINTS", "1").lower() in ("1", "true", "yes")
+CHECKPOINT_VERSION = 1
+
+
+class CheckpointStore:
+    """
+    Latest predictor state per ticker under predictor:checkpoint:{ticker}:
+    streaming indicator state, last featured row and the scaled window tails,
+    i.e. everything needed to carry on after the last processed candle, plus
+    the ticker's rolling prediction accuracy.
+
+    save() can queue onto a caller's pipeline, so a checkpoint is committed
+    in the same MULTI as the predictions of the candle it covers.
+    """
+
+    def __init__(self, client=redis_client):
+        self.client = client
+
+    @staticmethod
+    def _key(ticker: str) -> str:
+        return f"predictor:checkpoint:{ticker}"
+
+    def save(self, checkpoints: Dict[str, dict], client=None):
+        client = client or self.client
+        for ticker, checkpoint in checkpoints.items():
+            client.set(self._key(ticker), json.dumps({"version": CHECKPOINT_VERSION, **checkpoint}))
+
+    def load(self, tickers: Iterable[str]) -> Dict[str, dict]:
+        tickers = list(tickers)
+        values = self.client.mget([self._key(t) for t in tickers]) if tickers else []
+        checkpoints = {}
+        for ticker, value in zip(tickers, values):
+            if value:
+                checkpoint = json.loads(value)
+                if checkpoint.get("version") == CHECKPOINT_VERSION:
+                    checkpoints[ticker] = checkpoint
+        return checkpoints
+
+    def clear(self, tickers: Iterable[str]):
+        keys = [self._key(t) for t in tickers]
+        if keys:
+            self.client.delete(*keys)
+
+
+checkpoint_store = CheckpointStore()
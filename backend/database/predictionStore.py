@@ -0,0 +1,112 @@
+import calendar
+import json
+import os
+from datetime import datetime
+
+from database.redisClient import redis_client
+
+# Predictions older than this (relative to the newest one stored for the ticker) are trimmed on write; 0 keeps everything
+RETENTION_DAYS = float(os.getenv("PREDICTION_RETENTION_DAYS", "90"))
+
+# Writes a batch of predictions into the ticker's time-indexed history and moves
+# :latest forward, all in one atomic server-side call. ARGV is the retention in
+# seconds followed by (score, json) pairs; a score already present is replaced,
+# so re-running a day overwrites instead of duplicating.
+_SAVE_SCRIPT = """
+local top = redis.call('ZRANGE', KEYS[1], -1, -1, 'WITHSCORES')
+local best = top[2] and tonumber(top[2]) or -math.huge
+local top_score, top_value = nil, nil
+for i = 2, #ARGV, 2 do
+    local score = tonumber(ARGV[i])
+    redis.call('ZREMRANGEBYSCORE', KEYS[1], score, score)
+    redis.call('ZADD', KEYS[1], score, ARGV[i + 1])
+    if score >= best and (top_score == nil or score >= top_score) then
+        top_score, top_value = score, ARGV[i + 1]
+    end
+end
+if top_score ~= nil then
+    redis.call('SET', KEYS[2], top_value)
+    best = top_score
+end
+local retention = tonumber(ARGV[1])
+if retention > 0 then
+    redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', '(' .. (best - retention))
+end
+return top_score ~= nil and 1 or 0
+"""
+
+
+def prediction_field(result: dict) -> str:
+    """Simulated datetime of a prediction: simulation_date + prediction_for."""
+    return f"{result['simulation_date']} {result['prediction_for']}"
+
+
+def to_score(dt: datetime) -> int:
+    """Epoch seconds of a naive (exchange-local) datetime, the history's sort key."""
+    return calendar.timegm(dt.timetuple())
+
+
+def prediction_score(result: dict) -> int:
+    return to_score(datetime.strptime(prediction_field(result), "%Y-%m-%d %H:%M:%S"))
+
+
+class PredictionStore:
+    """
+    Redis persistence for predictions: predictions:{ticker}:history is a sorted
+    set of JSON predictions scored by epoch seconds, predictions:{ticker}:latest
+    the newest one.
+
+    Every save is a single EVALSHA; bulk saves are split into chunks that are
+    sent in one pipeline, so a whole backtest is one round trip. Range reads
+    are one ZRANGEBYSCORE and only touch the requested window.
+    """
+
+    def __init__(self, client=redis_client, chunk_size: int = 1000, retention_days: float = RETENTION_DAYS):
+        self.client = client
+        self.chunk_size = chunk_size
+        self.retention_seconds = int(retention_days * 86400)
+        self._script = client.register_script(_SAVE_SCRIPT)
+
+    @staticmethod
+    def _keys(ticker: str):
+        return [f"predictions:{ticker}:history", f"predictions:{ticker}:latest"]
+
+    def _args(self, results):
+        args = [self.retention_seconds]
+        for r in results:
+            args += [prediction_score(r), json.dumps(r)]
+        return args
+
+    def save(self, ticker: str, result: dict, client=None):
+        """Saves one prediction; with client (a pipeline) the call is only queued on it."""
+        self._script(keys=self._keys(ticker), args=self._args([result]), client=client)
+
+    def save_many(self, ticker: str, results: list):
+        if not results:
+            return
+        keys = self._keys(ticker)
+        pipe = self.client.pipeline(transaction=False)
+        for start in range(0, len(results), self.chunk_size):
+            self._script(keys=keys, args=self._args(results[start:start + self.chunk_size]), client=pipe)
+        pipe.execute()
+
+    def range(self, ticker: str, start: datetime = None, end: datetime = None, limit: int = None) -> list:
+        """
+        Predictions with start <= simulated time <= end, oldest first. With a
+        limit, the newest `limit` of them.
+        """
+        low = to_score(start) if start else "-inf"
+        high = to_score(end) if end else "+inf"
+        key = self._keys(ticker)[0]
+        if limit:
+            values = self.client.zrevrangebyscore(key, high, low, start=0, num=limit)[::-1]
+        else:
+            values = self.client.zrangebyscore(key, low, high)
+        return [json.loads(v) for v in values]
+
+    def latest(self, ticker: str):
+        value = self.client.get(self._keys(ticker)[1])
+        return json.loads(value) if value else None
+
+
+prediction_store = PredictionStore()
@@ -4,6 +4,13 @@ import os
 redis_url = os.getenv("REDIS_URL", "redis://redis:6379/0")
 redis_client = redis.Redis.from_url(redis_url, decode_responses=True)
 
+# Leases get their own client with short socket timeouts (well below any lease
+# TTL), so an unreachable Redis fails a renewal instead of hanging past expiry
+REDIS_LEASE_TIMEOUT_SECONDS = float(os.getenv("REDIS_LEASE_TIMEOUT_SECONDS", "2"))
+lease_client = redis.Redis.from_url(redis_url, decode_responses=True,
+                                    socket_timeout=REDIS_LEASE_TIMEOUT_SECONDS,
+                                    socket_connect_timeout=REDIS_LEASE_TIMEOUT_SECONDS)
+
 try:
     redis_client.ping()
     print("✅ Connected to Redis")
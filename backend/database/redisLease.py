@@ -0,0 +1,143 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from database.redisClient import lease_client
+
+# Lease calls are blocking redis-py calls; they run here rather than on the
+# event loop (or the default executor, which model work may be busy with)
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="redis-lease")
+
+# Only the owner may extend or drop a lease
+_RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisLease:
+    """
+    A named lease held by one owner at a time (SET NX PX), kept alive by
+    renew() and gone ttl_seconds after the owner stops renewing.
+    """
+
+    def __init__(self, key: str, owner: str, ttl_seconds: float = 15, client=lease_client):
+        self.key = key
+        self.owner = owner
+        self.ttl_ms = int(ttl_seconds * 1000)
+        self.client = client
+        self._renew = client.register_script(_RENEW_SCRIPT)
+        self._release = client.register_script(_RELEASE_SCRIPT)
+
+    def acquire(self) -> bool:
+        if self.client.set(self.key, self.owner, nx=True, px=self.ttl_ms):
+            return True
+        return self.renew()
+
+    def renew(self) -> bool:
+        return bool(self._renew(keys=[self.key], args=[self.owner, self.ttl_ms]))
+
+    def release(self):
+        self._release(keys=[self.key], args=[self.owner])
+
+    def holder(self):
+        return self.client.get(self.key)
+
+    async def call(self, fn, *args):
+        """Runs a blocking call (e.g. self.renew) off the event loop."""
+        return await asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
+
+
+async def _release_quietly(lease: RedisLease):
+    try:
+        await lease.call(lease.release)
+    except Exception as e:
+        print(f"[RedisLease] Could not release {lease.key}: {e}")
+
+
+def _is_done(lease: RedisLease, done_key: str) -> bool:
+    return bool(done_key) and bool(lease.client.exists(done_key))
+
+
+async def _cancel(task):
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+async def run_while_leader(lease: RedisLease, start, renew_every: float = None, name: str = "leader",
+                           done_key: str = None, done_ttl_seconds: int = 2 * 86400):
+    """
+    Campaigns for `lease` and runs the coroutine made by `start()` only while
+    holding it. The lease is renewed every renew_every seconds (a third of the
+    TTL by default); if a renewal fails, or Redis can't be reached for a whole
+    TTL, the coroutine is cancelled and we go back to campaigning. A dead
+    leader is therefore replaced within about TTL + renew_every. Returns when
+    the coroutine finishes on its own.
+
+    With a done_key, a coroutine that finishes (without returning False)
+    sets that key before the lease is released, and nobody campaigning for
+    the lease starts it again while the key exists: standbys return instead
+    of redoing the finished work.
+    """
+    ttl = lease.ttl_ms / 1000
+    renew_every = renew_every or ttl / 3
+    task, renewed_at = None, 0.0
+    try:
+        while True:
+            if task is not None and task.done():
+                result = task.result()
+                if done_key and result is not False:
+                    try:
+                        await lease.call(lambda: lease.client.set(done_key, lease.owner, ex=done_ttl_seconds))
+                    except Exception as e:
+                        print(f"[{name}] Could not mark {done_key}: {e}")
+                await _release_quietly(lease)
+                return result
+            try:
+                if task is None:
+                    if await lease.call(_is_done, lease, done_key):
+                        print(f"[{name}] {done_key} is already done; not campaigning")
+                        return None
+                    if await lease.call(lease.acquire):
+                        # the previous leader may have finished between the check and our acquire
+                        if await lease.call(_is_done, lease, done_key):
+                            await _release_quietly(lease)
+                            print(f"[{name}] {done_key} is already done; not campaigning")
+                            return None
+                        renewed_at = time.monotonic()
+                        print(f"[{name}] 👑 {lease.owner} is leader for {lease.key}")
+                        task = asyncio.create_task(start())
+                elif await lease.call(lease.renew):
+                    renewed_at = time.monotonic()
+                else:
+                    print(f"[{name}] Lost {lease.key} to {await lease.call(lease.holder)}; stopping")
+                    await _cancel(task)
+                    task = None
+            except Exception as e:
+                print(f"[{name}] Lease check failed: {e}")
+                if task is not None and time.monotonic() - renewed_at >= ttl:
+                    # our lease has expired by now and someone else may hold it
+                    print(f"[{name}] Lease on {lease.key} expired while Redis was unreachable; stopping")
+                    await _cancel(task)
+                    task = None
+            if task is None:
+                await asyncio.sleep(renew_every)
+            else:
+                # wakes early when the coroutine finishes, so the lease is handed on promptly
+                await asyncio.wait({task}, timeout=renew_every)
+    except asyncio.CancelledError:
+        if task is not None:
+            await _cancel(task)
+        await _release_quietly(lease)
+        raise
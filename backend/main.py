@@ -1,11 +1,17 @@
 from router import newsRoutes
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from database.postgresConn import create_all_tables
-import threading
+import asyncio
+import os
 
-from router import userRoutes, auth, agentRoutes, accountRoutes, explainerRoutes
-from Pred_models.trend_pred_new import TrendPredict
+from router import userRoutes, auth, agentRoutes, accountRoutes, explainerRoutes, candleRoutes
+from Pred_models.predictor_service import (
+    PredictorService, PREDICTOR_TICKERS, PREDICTOR_SETTLE_SECONDS, PREDICTOR_MISSED_TICKS, PREDICTOR_SOURCE
+)
+from Pred_models.metrics import collect
+from database.redisClient import redis_client
 
 app = FastAPI(
     title="AlgoTrading API"
@@ -25,26 +31,52 @@ app.add_middleware(
     allow_headers=["*"],         # allow all headers
 )
 
-def run_predictor_background():
+# Set to 0 when the predictor runs as its own process (predictor_worker.py)
+RUN_PREDICTOR_IN_API = os.getenv("RUN_PREDICTOR_IN_API", "1").lower() in ("1", "true", "yes")
+
+predictor_service = PredictorService(PREDICTOR_TICKERS)
+predictor_task = None
+
+@app.on_event("startup")
+async def start_predictor():
     """
-    Creates a predictor instance and runs it forever.
+    Runs the predictor service on the API's event loop, aligned to candle closes.
     """
-    print("--- 🚀 Starting background predictor thread... ---")
-    predictor = TrendPredict()
-    # Using shorter sleep time for quick testing. Change to 300 for 5 minutes.
-    predictor.run_continuously(sleep_seconds=300)
+    global predictor_task
+    if not RUN_PREDICTOR_IN_API:
+        print("--- Predictor runs in a separate worker (RUN_PREDICTOR_IN_API=0); not starting it here ---")
+        return
+    print(f"--- 🚀 Starting background predictor for {PREDICTOR_TICKERS}... ---")
+    predictor_task = asyncio.create_task(predictor_service.run_as_leader(
+        interval_seconds=300, settle_seconds=PREDICTOR_SETTLE_SECONDS, missed=PREDICTOR_MISSED_TICKS,
+        source=PREDICTOR_SOURCE
+    ))
+
+@app.on_event("shutdown")
+async def stop_predictor():
+    if predictor_task is not None and not predictor_task.done():
+        predictor_task.cancel()
+        try:
+            await predictor_task
+        except asyncio.CancelledError:
+            pass
 
 
 @app.post("/")
 def root():
     return {"data": "Welcome to the root endpoint"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """
+    Prediction pipeline latency histograms in the Prometheus text format,
+    including those published by a separate predictor worker.
+    """
+    return PlainTextResponse(collect(redis_client), media_type="text/plain; version=0.0.4")
+
 # init tables
 create_all_tables()
 
-predictor_thread = threading.Thread(target=run_predictor_background, daemon=True)
-predictor_thread.start()
-
 # Routers
 app.include_router(auth.router)
 app.include_router(accountRoutes.router)
@@ -52,3 +84,4 @@ app.include_router(userRoutes.router)
 app.include_router(newsRoutes.router)
 app.include_router(agentRoutes.router)
 app.include_router(explainerRoutes.router)
+app.include_router(candleRoutes.router)
@@ -0,0 +1,39 @@
+"""
+Standalone predictor process, so model compute never shares a GIL with the API.
+
+    cd backend && python predictor_worker.py
+
+Runs the same PredictorService the API would run in-process (configured by
+PREDICTOR_TICKERS, PREDICTOR_SETTLE_SECONDS, PREDICTOR_MISSED_TICKS) and talks
+to the API only through Redis: predictions:{ticker}:* and the
+predictor:status:{worker_id} heartbeat. Start the API with
+RUN_PREDICTOR_IN_API=0 so it doesn't run a second copy. Extra workers for the
+same PREDICTOR_SHARD stand by and take over if the leader dies.
+SIGTERM/SIGINT stop it cleanly.
+"""
+import asyncio
+import signal
+
+from Pred_models.predictor_service import (
+    PredictorService, PREDICTOR_TICKERS, PREDICTOR_SETTLE_SECONDS, PREDICTOR_MISSED_TICKS, PREDICTOR_SOURCE
+)
+
+
+async def main():
+    service = PredictorService(PREDICTOR_TICKERS)
+    print(f"--- 🚀 Predictor worker {service.worker_id} starting for {PREDICTOR_TICKERS} ---")
+    task = asyncio.create_task(service.run_as_leader(
+        interval_seconds=300, settle_seconds=PREDICTOR_SETTLE_SECONDS, missed=PREDICTOR_MISSED_TICKS,
+        source=PREDICTOR_SOURCE
+    ))
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, task.cancel)
+    try:
+        await task
+    except asyncio.CancelledError:
+        print(f"--- Predictor worker {service.worker_id} stopped ---")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
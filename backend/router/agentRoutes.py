@@ -1,10 +1,13 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Query, status
 from agents.signalAgent import SignalAgent
 from agents.CapitalAllocator import CapitalAllocator
 from fastapi.encoders import jsonable_encoder
 import json
 import os
 import asyncio
+import socket
+import threading
+import time
 from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 import uuid
@@ -23,8 +26,12 @@ from router.newsRoutes import get_news_sentiment
 from router.accountRoutes import get_account, get_all_accounts, create_account, update_account, fetch_account
 
 from Pred_models.trend_pred_new import TrendPredict
+from Pred_models.model_registry import registry
 
 from database.redisClient import redis_client
+from database.predictionStore import prediction_store
+from database.redisLease import RedisLease
+from Pred_models.accuracy import load_accuracy
 
 path = os.path.join("prediction.json")
 
@@ -134,7 +141,114 @@ def save_agent_response(
 
 #---------- TREND, SIGNAL, ALLOCATE endpoints ----------
 executor = ThreadPoolExecutor(max_workers=2)
-tp = TrendPredict()
+
+# At most one /trend simulation per ticker: _simulations coalesces requests in
+# this process, the simulation:{ticker} lease (renewed while it runs) across
+# API workers. If a worker dies, its lease lapses and the next miss restarts it.
+# A simulation that ends without a prediction (no data for the day, unknown
+# ticker, model errors) is remembered for SIMULATION_RETRY_SECONDS, here and in
+# simulation:{ticker}:outcome, and reported instead of being rerun on every miss.
+SIMULATION_LEASE_SECONDS = 30
+SIMULATION_RETRY_SECONDS = int(os.getenv("SIMULATION_RETRY_SECONDS", "300"))
+_worker_id = f"{socket.gethostname()}:{os.getpid()}"
+_simulations = {}  # ticker -> {"started_at", "task"}
+_simulations_lock = threading.Lock()
+_outcomes = {}  # ticker -> (expires at, outcome)
+
+
+def _simulate(ticker: str) -> bool:
+    """Runs the simulation; True if it left a prediction behind."""
+    TrendPredict(ticker).run_simulation()
+    return prediction_store.latest(ticker) is not None
+
+
+async def _record_outcome(ticker: str, lease: RedisLease, message: str):
+    outcome = {"status": "FAILED", "message": message, "owner": _worker_id,
+               "finished_at": datetime.now(timezone.utc).isoformat()}
+    _outcomes[ticker] = (time.monotonic() + SIMULATION_RETRY_SECONDS, outcome)
+    try:
+        await lease.call(lambda: lease.client.set(f"simulation:{ticker}:outcome", json.dumps(outcome),
+                                                  ex=SIMULATION_RETRY_SECONDS))
+    except Exception as e:
+        print(f"⚠️ Could not store the simulation outcome for {ticker}: {e}")
+
+
+async def _last_outcome(ticker: str, lease: RedisLease):
+    """Recent failed outcome of a simulation of this ticker (from any worker), if any."""
+    expires, outcome = _outcomes.get(ticker, (0, None))
+    if outcome is not None and time.monotonic() < expires:
+        return outcome
+    _outcomes.pop(ticker, None)
+    value = await lease.call(lease.client.get, f"simulation:{ticker}:outcome")
+    return json.loads(value) if value else None
+
+
+async def _run_simulation(ticker: str, lease: RedisLease):
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(executor, _simulate, ticker)
+    try:
+        while True:
+            done, _ = await asyncio.wait({future}, timeout=SIMULATION_LEASE_SECONDS / 3)
+            if done:
+                if future.result():
+                    print(f"✅ Simulation for {ticker} finished")
+                else:
+                    print(f"❌ Simulation for {ticker} finished without a prediction")
+                    await _record_outcome(ticker, lease, "Simulation finished without a prediction "
+                                                         "(no data or models for this ticker/day?)")
+                return
+            try:
+                if not await lease.call(lease.renew):
+                    print(f"⚠️ Lost the simulation lease for {ticker} to {await lease.call(lease.holder)}")
+            except Exception as e:
+                print(f"⚠️ Could not renew the simulation lease for {ticker}: {e}")
+    except Exception as e:
+        print(f"❌ Simulation for {ticker} failed: {e}")
+        await _record_outcome(ticker, lease, f"Simulation failed: {e}")
+    finally:
+        with _simulations_lock:
+            _simulations.pop(ticker, None)
+        try:
+            await lease.call(lease.release)
+        except Exception as e:
+            print(f"⚠️ Could not release the simulation lease for {ticker}: {e}")
+
+
+async def _start_simulation(ticker: str) -> dict:
+    """
+    Starts a background simulation unless one is already in flight here or in
+    another worker, or one recently failed (then its outcome is returned).
+    """
+    with _simulations_lock:
+        running = _simulations.get(ticker)
+        if running:
+            return {"started": False, "owner": _worker_id, "started_at": running["started_at"]}
+        # hold the slot while Redis is asked, so concurrent misses here join this one
+        _simulations[ticker] = {"started_at": None, "task": None}
+
+    lease = RedisLease(f"simulation:{ticker}", _worker_id, SIMULATION_LEASE_SECONDS)
+    try:
+        outcome = await _last_outcome(ticker, lease)
+        acquired = outcome is None and await lease.call(lease.acquire)
+        holder = None if acquired or outcome else await lease.call(lease.holder)
+    except BaseException:
+        with _simulations_lock:
+            _simulations.pop(ticker, None)
+        raise
+    if not acquired:
+        with _simulations_lock:
+            _simulations.pop(ticker, None)
+        if outcome:
+            return {"started": False, "outcome": outcome}
+        return {"started": False, "owner": holder, "started_at": None}
+
+    started_at = datetime.now(timezone.utc).isoformat()
+    with _simulations_lock:
+        _simulations[ticker] = {"started_at": started_at,
+                                "task": asyncio.create_task(_run_simulation(ticker, lease))}
+    return {"started": True, "owner": _worker_id, "started_at": started_at}
+
+
 @router.get("/trend")
 async def trend_prediction(ticker: str = "TATAMOTORS"):
     try:
@@ -149,16 +263,28 @@ async def trend_prediction(ticker: str = "TATAMOTORS"):
         if latest_prediction:
             return latest_prediction
 
-        # If not cached → trigger simulation
-        loop = asyncio.get_running_loop()
-        loop.run_in_executor(executor, tp.run_simulation)
-        print(f"⚡ Started simulation for {ticker} in background...")
+        # If not cached → trigger simulation (or join the one already running)
+        simulation = await _start_simulation(ticker)
+        if "outcome" in simulation:
+            return {
+                "ticker": ticker,
+                "status": simulation["outcome"]["status"],
+                "message": simulation["outcome"]["message"],
+                "simulation": simulation["outcome"],
+                "timestamp": datetime.now(timezone.utc).isoformat()
+            }
+        if simulation["started"]:
+            print(f"⚡ Started simulation for {ticker} in background...")
+            message = "No cached prediction found. Simulation started..."
+        else:
+            message = "No cached prediction found. Simulation already running..."
 
         # Tell client prediction will come later
         return {
             "ticker": ticker,
             "status": "RUNNING",
-            "message": "No cached prediction found. Simulation started...",
+            "message": message,
+            "simulation": {"owner": simulation["owner"], "started_at": simulation["started_at"]},
             "timestamp": datetime.now(timezone.utc).isoformat()
         }
 
@@ -167,6 +293,50 @@ async def trend_prediction(ticker: str = "TATAMOTORS"):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/predictions/{ticker}")
+async def prediction_history(
+    ticker: str,
+    from_: str = Query(None, alias="from", description="ISO date/datetime, inclusive"),
+    to: str = Query(None, description="ISO date/datetime, inclusive"),
+    limit: int = Query(500, ge=1, le=10000, description="newest N predictions in the window"),
+):
+    """Predictions whose simulated time falls in [from, to], oldest first."""
+    try:
+        start = datetime.fromisoformat(from_) if from_ else None
+        end = datetime.fromisoformat(to) if to else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid from/to: {e}")
+    if end is not None and len(to) == 10:  # a bare date means the whole day
+        end = end.replace(hour=23, minute=59, second=59)
+
+    predictions = prediction_store.range(ticker, start, end, limit)
+    return {"ticker": ticker, "count": len(predictions), "predictions": predictions}
+
+@router.get("/predictor/status")
+async def predictor_status():
+    """Latest heartbeat of every running predictor (in-process or predictor_worker.py)."""
+    keys = list(redis_client.scan_iter(match="predictor:status:*"))
+    workers = [json.loads(v) for v in redis_client.mget(keys) if v] if keys else []
+    return {"workers": workers}
+
+@router.get("/accuracy")
+async def prediction_accuracy():
+    """Rolling MAE, hit rate and Brier score of every ticker the predictor is scoring."""
+    return {"tickers": load_accuracy()}
+
+@router.get("/accuracy/{ticker}")
+async def ticker_accuracy(ticker: str):
+    """Rolling and lifetime accuracy of one ticker's predictions, plus its last scored one."""
+    accuracy = load_accuracy(ticker)
+    if ticker not in accuracy:
+        raise HTTPException(status_code=404, detail=f"No accuracy data yet for {ticker}")
+    return accuracy[ticker]
+
+@router.get("/models/registry")
+async def model_registry_stats():
+    """Load time, warm-up time and memory footprint of every loaded model/scaler."""
+    return registry.stats()
+
 signalAgent = SignalAgent()
 @router.get("/signal", response_model=SignalResponse)
 async def signal_endpoint(ticker: str = "TATAMOTORS"):
@@ -0,0 +1,46 @@
+# backend/router/candleRoutes.py
+import asyncio
+from datetime import datetime
+
+from fastapi import APIRouter, HTTPException, Query
+
+from Pred_models.candle_pyramid import get_pyramid, TIMEFRAMES
+from Pred_models.trend_pred_new import TrendPredict
+
+
+router = APIRouter(prefix="/candles", tags=["Candles"])
+
+@router.get("/{ticker}")
+async def get_candles(
+    ticker: str,
+    tf: str = Query("5m", description=f"one of {TIMEFRAMES}"),
+    from_: str = Query(None, alias="from", description="ISO date/datetime, inclusive"),
+    to: str = Query(None, description="ISO date/datetime, inclusive"),
+    limit: int = Query(2000, ge=1, le=100000, description="newest N candles in the window"),
+):
+    """
+    OHLCV candles of one timeframe from the precomputed pyramid (the forming
+    candle included), oldest first.
+    """
+    if tf not in TIMEFRAMES:
+        raise HTTPException(status_code=400, detail=f"Unknown timeframe '{tf}'. Choose from {TIMEFRAMES}.")
+    try:
+        start = datetime.fromisoformat(from_) if from_ else None
+        end = datetime.fromisoformat(to) if to else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid from/to: {e}")
+    if end is not None and len(to) == 10:  # a bare date means the whole day
+        end = end.replace(hour=23, minute=59, second=59)
+
+    try:
+        # first request for a ticker may backfill from its minute CSV
+        pyramid = await asyncio.get_running_loop().run_in_executor(
+            None, get_pyramid, ticker, TrendPredict(ticker).DATA_FILE
+        )
+        candles = pyramid.range(tf, start, end, limit)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"No minute data for {ticker}")
+
+    candles = candles.reset_index()
+    candles["date"] = candles["date"].dt.strftime("%Y-%m-%dT%H:%M:%S")
+    return {"ticker": ticker, "tf": tf, "count": len(candles), "candles": candles.to_dict(orient="records")}
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modules import each other from backend/ (e.g. `from Pred_models.x import y`)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
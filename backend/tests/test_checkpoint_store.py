@@ -0,0 +1,21 @@
+import fakeredis
+
+from database.checkpointStore import CheckpointStore
+from database.predictionStore import PredictionStore
+
+
+def test_checkpoint_commits_in_the_same_multi_as_the_predictions():
+    client = fakeredis.FakeRedis(decode_responses=True)
+    store, checkpoints = PredictionStore(client=client), CheckpointStore(client=client)
+    result = {"simulation_date": "2025-07-21", "prediction_for": "09:25:00", "current_price": 101.0}
+    checkpoint = {"features": {"last_timestamp": "2025-07-21 09:25:00"}}
+
+    pipe = client.pipeline(transaction=True)
+    store.save("AAA", result, client=pipe)
+    checkpoints.save({"AAA": checkpoint}, client=pipe)
+    assert store.latest("AAA") is None and checkpoints.load(["AAA"]) == {}
+
+    pipe.execute()
+
+    assert store.latest("AAA") == result
+    assert checkpoints.load(["AAA"])["AAA"]["features"] == checkpoint["features"]
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import MinMaxScaler, RobustScaler, StandardScaler
+
+from Pred_models.feature_matrix import FeatureMatrix
+
+FEATURES = ["a", "b", "c"]
+
+
+@pytest.fixture(scope="module")
+def frames():
+    rng = np.random.default_rng(0)
+    fit = pd.DataFrame(rng.normal(5, 2, (200, 3)), columns=FEATURES)
+    # rows outside the fitted range, so a clipping scaler has something to clip
+    rows = pd.DataFrame(rng.normal(5, 6, (80, 3)), columns=FEATURES)
+    return fit, rows
+
+
+@pytest.mark.parametrize("scaler", [
+    StandardScaler(),
+    StandardScaler(with_mean=False),
+    StandardScaler(with_std=False),
+    MinMaxScaler(),
+    MinMaxScaler(clip=True),
+    RobustScaler(),
+], ids=repr)
+def test_append_scales_like_extend(scaler, frames):
+    fit, rows = frames
+    scaler.fit(fit)
+    extended = FeatureMatrix.from_frame(rows, FEATURES, scaler, time_steps=10)
+    appended = FeatureMatrix(FEATURES, scaler, time_steps=10)
+    for _, row in rows.iterrows():
+        appended.append(row)
+
+    np.testing.assert_allclose(appended.values, extended.values, rtol=1e-6, atol=1e-6)
@@ -0,0 +1,66 @@
+from datetime import datetime
+
+import fakeredis
+import pytest
+
+from database.predictionStore import PredictionStore
+
+
+def _result(time: str, price: float, day: str = "2025-07-21") -> dict:
+    return {"simulation_date": day, "prediction_for": time, "current_price": price}
+
+
+@pytest.fixture
+def client():
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+def test_save_writes_history_and_latest_in_one_call(client):
+    store = PredictionStore(client=client)
+    store.save("AAA", _result("09:20:00", 100.0))
+
+    assert store.latest("AAA")["current_price"] == 100.0
+    assert client.zcard("predictions:AAA:history") == 1
+
+
+def test_save_queued_on_a_pipeline_runs_on_execute(client):
+    store = PredictionStore(client=client)
+
+    # the script is not loaded yet, so the pipeline has to load it before MULTI
+    pipe = client.pipeline(transaction=True)
+    store.save("AAA", _result("09:20:00", 100.0), client=pipe)
+    store.save("AAA", _result("09:25:00", 101.0), client=pipe)
+    assert store.latest("AAA") is None
+
+    pipe.execute()
+
+    assert store.latest("AAA")["current_price"] == 101.0
+    assert client.zcard("predictions:AAA:history") == 2
+
+
+def test_replayed_saves_overwrite_and_latest_never_moves_back(client):
+    store = PredictionStore(client=client, chunk_size=2)
+    store.save_many("AAA", [_result("09:20:00", 100.0), _result("09:25:00", 101.0), _result("09:30:00", 102.0)])
+
+    store.save("AAA", _result("09:20:00", 99.0))
+
+    assert [r["current_price"] for r in store.range("AAA")] == [99.0, 101.0, 102.0]
+    assert store.latest("AAA")["prediction_for"] == "09:30:00"
+
+
+def test_range_reads_only_the_requested_window(client):
+    store = PredictionStore(client=client)
+    store.save_many("AAA", [_result(f"09:{m:02d}:00", float(m)) for m in range(15, 60, 5)])
+
+    window = store.range("AAA", datetime(2025, 7, 21, 9, 25), datetime(2025, 7, 21, 9, 40))
+    assert [r["prediction_for"] for r in window] == ["09:25:00", "09:30:00", "09:35:00", "09:40:00"]
+    assert [r["prediction_for"] for r in store.range("AAA", limit=2)] == ["09:50:00", "09:55:00"]
+    assert store.range("BBB") == []
+
+
+def test_history_older_than_retention_is_trimmed(client):
+    store = PredictionStore(client=client, retention_days=1)
+    store.save("AAA", _result("09:20:00", 100.0, day="2025-07-18"))
+    store.save("AAA", _result("09:20:00", 101.0, day="2025-07-21"))
+
+    assert [r["simulation_date"] for r in store.range("AAA")] == ["2025-07-21"]
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from agents.signalAgent import REGIMES, SignalAgent
+
+
+@pytest.fixture(scope="module")
+def rows():
+    """20k random inputs covering every regime, zero prices and 0/1 trend probabilities."""
+    rng = np.random.default_rng(0)
+    n = 20000
+    price = rng.uniform(50, 500, n)
+    price[rng.random(n) < 0.02] = 0.0
+    trend_prob = rng.random(n)
+    trend_prob[rng.random(n) < 0.05] = 0.0
+    trend_prob[rng.random(n) < 0.05] = 1.0
+    return {
+        "trend_prob": trend_prob,
+        "news_score": rng.uniform(-1, 1, n),
+        "current_price": price,
+        "predicted_price": price * (1 + rng.normal(0, 0.05, n)),
+        "atr": price * rng.uniform(0, 0.02, n),
+        "ma_short": price * (1 + rng.normal(0, 0.01, n)),
+        "ma_long": price * (1 + rng.normal(0, 0.01, n)),
+    }
+
+
+def test_generate_signals_matches_generate_signal(rows):
+    agent = SignalAgent()
+    batch = agent.generate_signals(**rows)
+    assert set(batch["market_regime"]) == set(REGIMES)
+    assert set(batch["signal"]) == {"BUY", "SELL", "HOLD"}
+
+    mismatches = []
+    for i in range(len(rows["trend_prob"])):
+        row = {name: float(values[i]) for name, values in rows.items()}
+        scalar = agent.generate_signal({**row, "ticker": "AAA", "movement": "UP", "pred_for": None, "sim_date": None})
+        expected = (scalar["signal"], scalar["confidence"], scalar["combined_score"],
+                    scalar["sources"]["price_diff"], scalar["sources"]["market_regime"])
+        actual = (batch["signal"][i], round(float(batch["confidence"][i]), 4),
+                  round(float(batch["combined_score"][i]), 4), round(float(batch["price_diff"][i]), 4),
+                  batch["market_regime"][i])
+        if actual != expected:
+            mismatches.append((i, expected, actual))
+
+    assert not mismatches, mismatches[:5]
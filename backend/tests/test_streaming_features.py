@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import synthetic_minute_bars
+from Pred_models.data_cache import resample_5min
+from Pred_models.indicators import FEATURE_COLUMNS, StreamingFeatures
+from Pred_models.trend_pred_new import TrendPredict
+
+
+@pytest.fixture(scope="module")
+def bars_5min():
+    return resample_5min(synthetic_minute_bars(days=10))
+
+
+def test_streaming_matches_add_features(bars_5min):
+    expected = TrendPredict().add_features(bars_5min)
+    streamed = StreamingFeatures().update_frame(bars_5min)
+
+    assert list(streamed.columns) == FEATURE_COLUMNS == list(expected.columns)
+    assert streamed.index.equals(expected.index)
+    np.testing.assert_allclose(streamed.to_numpy(), expected.to_numpy(), rtol=1e-5, atol=1e-6)
+
+
+def test_streaming_warms_up_on_the_rows_add_features_drops(bars_5min):
+    features = StreamingFeatures()
+    rows = [features.update(ts, *candle) for ts, candle in
+            zip(bars_5min.index, bars_5min[["open", "high", "low", "close", "volume"]].itertuples(index=False))]
+    first_warm = next(i for i, row in enumerate(rows) if row is not None)
+
+    assert all(row is not None for row in rows[first_warm:])
+    assert bars_5min.index[first_warm] == TrendPredict().add_features(bars_5min).index[0]